@@ -1,22 +1,52 @@
-from flask import Flask, jsonify
+from flask import Flask, Response, abort, jsonify, request
 from flask_bcrypt import Bcrypt
 from config import Config
+import db
+from utils import compression, metrics
 from routes.auth import auth_bp
 from routes.categories import categories_bp
 from routes.bills import bills_bp
+from routes.budget import budget_bp
+from audio_process.speach_to_text import get_transcritor
+from utils.password_hasher import get_password_hasher
 
 app = Flask(__name__)
 app.config.from_object(Config)
 
 bcrypt = Bcrypt(app)
+db.init_app(app)
+compression.init_app(app)
+metrics.init_app(app)
+metrics.register_gauges(lambda: {f'db_pool_{key}': value for key, value in db.get_pool_stats().items()})
+metrics.register_gauges(lambda: {f'password_hasher_{key}': value for key, value in get_password_hasher().stats().items()})
 
 app.register_blueprint(auth_bp, url_prefix='/api/auth')
 app.register_blueprint(categories_bp, url_prefix='/api')
 app.register_blueprint(bills_bp, url_prefix='/api')
+app.register_blueprint(budget_bp, url_prefix='/api')
 
 @app.route('/', methods=["GET", "POST", "PUT", "DELETE"])
 def hello_world():
     return jsonify({"message": "API de Contas Rodando!"})
 
+@app.route('/health', methods=["GET"])
+def health():
+    # Liveness stays public; the pool, cache and hasher internals go with /metrics' token.
+    if not metrics.metrics_authorized(request.headers.get('Authorization')):
+        return jsonify({"status": "ok"})
+    cache = get_transcritor().cache
+    return jsonify({
+        "db_pool": db.get_pool_stats(),
+        "transcription_cache": cache.stats() if cache else None,
+        "password_hasher": get_password_hasher().stats()
+    })
+
+@app.route('/metrics', methods=["GET"])
+def prometheus_metrics():
+    if not metrics.metrics_authorized(request.headers.get('Authorization')):
+        # 404 rather than 401, so the endpoint is not advertised to whoever is probing.
+        abort(404)
+    return Response(metrics.render_metrics(), mimetype='text/plain; version=0.0.4')
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=8000)
\ No newline at end of file
@@ -0,0 +1,40 @@
+import re
+import unicodedata
+from functools import lru_cache
+
+
+@lru_cache(maxsize=4096)
+def _dobrar_caractere(c):
+    return unicodedata.normalize("NFD", c)[0].lower()[0]
+
+
+def dobrar(texto: str) -> str:
+    """Minúsculas e sem acentos, caractere a caractere, preservando as posições do texto original."""
+    return "".join(_dobrar_caractere(c) for c in texto)
+
+
+class CategoryMatcher:
+    """Encontra a primeira categoria citada numa frase com uma única regex de alternativas."""
+
+    def __init__(self, categorias):
+        # categorias: pares (id, nome); o id pode ser None para listas fixas.
+        self.categorias = {}
+        for category_id, nome in categorias:
+            self.categorias.setdefault(dobrar(nome), (category_id, nome))
+        alternativas = sorted(self.categorias, key=len, reverse=True)
+        self.regex = re.compile("|".join(re.escape(a) for a in alternativas)) if alternativas else None
+
+    def buscar(self, frase_dobrada: str):
+        """Retorna (posição, id, nome) da categoria mais à esquerda, ou None."""
+        if self.regex is None:
+            return None
+        match = self.regex.search(frase_dobrada)
+        if not match:
+            return None
+        category_id, nome = self.categorias[match.group(0)]
+        return match.start(), category_id, nome
+
+    def resolver(self, nome: str):
+        """Retorna (id, nome cadastrado) para um nome exato, ignorando caixa e acentos."""
+        return self.categorias.get(dobrar(nome.strip()))
+
@@ -0,0 +1,99 @@
+"""Servidor gRPC local que imita a API Speech-to-Text com transcrições fixas.
+
+Uso: python -m audio_process.fake_speech_server --port 50051 "mercado 50 reais"
+e depois rode a API com SPEECH_API_ENDPOINT=localhost:50051.
+"""
+import argparse
+import itertools
+import threading
+import uuid
+from concurrent import futures
+import grpc
+from google.cloud import speech
+from google.longrunning import operations_pb2
+from google.protobuf import any_pb2
+
+SPEECH_SERVICE = 'google.cloud.speech.v1.Speech'
+
+
+class FakeSpeechServicer:
+    def __init__(self, transcricoes):
+        self._transcricoes = itertools.cycle(transcricoes)
+        self._lock = threading.Lock()
+
+    def _proxima(self):
+        with self._lock:
+            return next(self._transcricoes)
+
+    def _resultados(self):
+        alternativa = speech.SpeechRecognitionAlternative(transcript=self._proxima(), confidence=0.95)
+        return [speech.SpeechRecognitionResult(alternatives=[alternativa])]
+
+    def recognize(self, request, context):
+        return speech.RecognizeResponse(results=self._resultados())
+
+    def long_running_recognize(self, request, context):
+        # Responde com a operação já concluída, então o cliente não precisa consultar GetOperation.
+        response = any_pb2.Any()
+        response.Pack(speech.LongRunningRecognizeResponse.pb(
+            speech.LongRunningRecognizeResponse(results=self._resultados())
+        ))
+        return operations_pb2.Operation(name=uuid.uuid4().hex, done=True, response=response)
+
+    def streaming_recognize(self, request_iterator, context):
+        transcricao = self._proxima()
+        palavras = transcricao.split()
+        blocos = 0
+        for requisicao in request_iterator:
+            # A primeira mensagem traz só o streaming_config.
+            if not requisicao.audio_content:
+                continue
+            blocos += 1
+            if blocos < len(palavras):
+                yield self._resposta_stream(" ".join(palavras[:blocos]), final=False)
+        yield self._resposta_stream(transcricao, final=True)
+
+    def _resposta_stream(self, transcricao, final):
+        alternativa = speech.SpeechRecognitionAlternative(transcript=transcricao, confidence=0.95 if final else 0.0)
+        resultado = speech.StreamingRecognitionResult(
+            alternatives=[alternativa], is_final=final, stability=1.0 if final else 0.5
+        )
+        return speech.StreamingRecognizeResponse(results=[resultado])
+
+    def handlers(self):
+        return grpc.method_handlers_generic_handler(SPEECH_SERVICE, {
+            'Recognize': grpc.unary_unary_rpc_method_handler(
+                self.recognize,
+                request_deserializer=speech.RecognizeRequest.deserialize,
+                response_serializer=speech.RecognizeResponse.serialize,
+            ),
+            'LongRunningRecognize': grpc.unary_unary_rpc_method_handler(
+                self.long_running_recognize,
+                request_deserializer=speech.LongRunningRecognizeRequest.deserialize,
+                response_serializer=operations_pb2.Operation.SerializeToString,
+            ),
+            'StreamingRecognize': grpc.stream_stream_rpc_method_handler(
+                self.streaming_recognize,
+                request_deserializer=speech.StreamingRecognizeRequest.deserialize,
+                response_serializer=speech.StreamingRecognizeResponse.serialize,
+            ),
+        })
+
+
+def criar_servidor(transcricoes, port=50051, max_workers=10):
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=max_workers))
+    server.add_generic_rpc_handlers((FakeSpeechServicer(transcricoes).handlers(),))
+    bound_port = server.add_insecure_port(f'[::]:{port}')
+    return server, bound_port
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Servidor Speech-to-Text falso para testes offline.")
+    parser.add_argument('--port', type=int, default=50051)
+    parser.add_argument('transcricoes', nargs='*', default=['mercado 50 reais'])
+    args = parser.parse_args()
+
+    server, port = criar_servidor(args.transcricoes, args.port)
+    server.start()
+    print(f"Servidor Speech falso ouvindo em localhost:{port}")
+    server.wait_for_termination()
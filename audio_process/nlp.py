@@ -1,62 +1,112 @@
 import re
 import json
+import asyncio
+import itertools
 from datetime import date
 import aiofiles
+from audio_process.category_matcher import CategoryMatcher, dobrar
+from audio_process.spacy_extractor import carregar_modelo, extrair_data, extrair_local, valor_por_extenso
+from config import Config
+from utils.metrics import time_external_call
 
 class ProcessadorFrase:
     CATEGORIAS = ["CARTAO", "ALUGUEL", "COMIDA", "MERCADO", "ROLES", "OUTROS", "COMBUSTIVEL", "CONTAS"]
+    CATEGORIA_PADRAO = "OUTROS"
+    PADRAO_VALOR = re.compile(r"(\d+[,.]?\d*)\s*(reais|rs|r\$)?")
+    MATCHER_PADRAO = CategoryMatcher([(None, cat) for cat in CATEGORIAS])
 
-    def __init__(self):
-        pass
+    def __init__(self, matcher: CategoryMatcher = None, usar_spacy: bool = None):
+        # Com o matcher de um usuário (category_cache.get_matcher), o resultado já traz categoria_id.
+        self.matcher = matcher or self.MATCHER_PADRAO
+        self.usar_spacy = Config.NLP_MODE == "spacy" if usar_spacy is None else usar_spacy
 
-    async def processar(self, frase: str) -> dict:
+    def _extrair(self, frase: str, doc=None) -> dict:
         resultado = {
             "frase": frase,
             "valor": None,
             "local": "Desconhecido",
             "data": str(date.today()),
-            "categoria": "OUTROS"
+            "categoria": self.CATEGORIA_PADRAO,
+            "categoria_id": None
         }
+        frase_dobrada = dobrar(frase)
+        texto = frase
+
+        if doc is not None:
+            data, span = extrair_data(frase_dobrada)
+            if data:
+                resultado["data"] = str(data)
+                # Blanked out, not removed, so every index still points into the original phrase.
+                inicio, fim = span
+                espacos = " " * (fim - inicio)
+                frase_dobrada = frase_dobrada[:inicio] + espacos + frase_dobrada[fim:]
+                texto = frase[:inicio] + espacos + frase[fim:]
 
-        padrao_valor = re.search(r"(\d+[,.]?\d*)\s*(reais|rs|r\$)?", frase, re.IGNORECASE)
+        padrao_valor = self.PADRAO_VALOR.search(frase_dobrada)
+        valor_idx = len(frase)
         if padrao_valor:
+            valor_idx = padrao_valor.start()
             valor_str = padrao_valor.group(1).replace(",", ".")
             try:
                 resultado["valor"] = float(valor_str)
             except ValueError:
                 pass
+        elif doc is not None:
+            valor, token_idx = valor_por_extenso([dobrar(token.text) for token in doc])
+            if valor is not None:
+                resultado["valor"] = valor
+                valor_idx = doc[token_idx].idx
 
-        for cat in self.CATEGORIAS:
-            if cat.lower() in frase.lower():
-                resultado["categoria"] = cat
-                break
+        encontrada = self.matcher.buscar(frase_dobrada)
+        if encontrada:
+            categoria_idx, resultado["categoria_id"], resultado["categoria"] = encontrada
+        else:
+            categoria_idx = len(frase)
+            padrao = self.matcher.resolver(self.CATEGORIA_PADRAO)
+            if padrao:
+                resultado["categoria_id"], resultado["categoria"] = padrao
 
-        valor_idx = padrao_valor.start() if padrao_valor else len(frase)
-        categoria_idx = min(
-            [frase.lower().find(cat.lower()) for cat in self.CATEGORIAS if cat.lower() in frase.lower()] + [len(frase)]
-        )
-        possivel_local = frase[:min(valor_idx, categoria_idx)].strip()
+        possivel_local = " ".join(texto[:min(valor_idx, categoria_idx)].split())
+        if doc is not None:
+            possivel_local = extrair_local(doc) or possivel_local
 
         if possivel_local:
             resultado["local"] = possivel_local
 
         return resultado
 
-    async def processar_de_json(self, caminho_json: str) -> dict:
-        async with aiofiles.open(caminho_json, "r", encoding="utf-8") as f:
-            conteudo = await f.read()
-            data = json.loads(conteudo)
+    async def processar(self, frase: str) -> dict:
+        with time_external_call("nlp_parse"):
+            doc = carregar_modelo()(frase) if self.usar_spacy else None
+            return self._extrair(frase, doc)
 
+    async def processar_lote(self, frases: list) -> list:
+        # Extraction is synchronous CPU work, so a plain loop; nlp.pipe is lazy, and the timing has
+        # to cover the extraction that consumes it.
+        with time_external_call("nlp_parse_batch"):
+            if self.usar_spacy:
+                docs = carregar_modelo().pipe(frases, batch_size=Config.SPACY_BATCH_SIZE)
+            else:
+                docs = itertools.repeat(None)
+            return [self._extrair(frase, doc) for frase, doc in zip(frases, docs)]
+
+    async def processar_transcricao(self, data: dict) -> dict:
         if len(data["resultados"]) > 0 :
             frase = data["resultados"][0]["alternativas"][0]["transcricao"]
             return await self.processar(frase)
         return None
 
+    async def processar_de_json(self, caminho_json: str) -> dict:
+        async with aiofiles.open(caminho_json, "r", encoding="utf-8") as f:
+            conteudo = await f.read()
+            data = json.loads(conteudo)
+
+        return await self.processar_transcricao(data)
+
 
 
 # Permite uso como script e como módulo importável
 def processar_frase_de_json(caminho_json: str):
-    import asyncio
     pf = ProcessadorFrase()
     return asyncio.run(pf.processar_de_json(caminho_json))
 
@@ -0,0 +1,63 @@
+import asyncio
+from werkzeug.utils import secure_filename
+from audio_process.nlp import ProcessadorFrase
+from audio_process.speach_to_text import ErroConversaoAudio, get_transcritor
+from db import get_db_connection, close_db_connection
+import repository
+from utils.bill_changes import next_change_seq
+from utils.budget_history import refresh_budget_history
+from utils.budget_summary import invalidate_budget_summary
+from utils.category_cache import get_matcher
+from utils.job_queue import JobError, register_job_handler
+import mysql.connector
+
+AUDIO_BILL_JOB = 'audio_bill'
+
+
+@register_job_handler(AUDIO_BILL_JOB)
+def processar_audio_job(job):
+    user_id = job['user_id']
+    filename = secure_filename(job['payload'].get('filename', '')) or 'audio'
+
+    try:
+        transcricao = get_transcritor().transcrever_bytes(job['data'], nome_debug=filename)
+    except ErroConversaoAudio as err:
+        print(f"Erro ao converter o áudio do job {job['id']}: {err}")
+        raise JobError('Formato de áudio não suportado.')
+
+    pf = ProcessadorFrase(get_matcher(user_id))
+    nlp_result = asyncio.run(pf.processar_transcricao(transcricao))
+    return salvar_conta(user_id, nlp_result)
+
+
+def salvar_conta(user_id, nlp_result):
+    """Valida o resultado do NLP e grava a conta; erros viram JobError com a mensagem para o usuário."""
+    if not nlp_result:
+        raise JobError('Não foi possível extrair todos os dados do áudio.')
+    category = nlp_result.get('categoria')
+    category_id = nlp_result.get('categoria_id')
+    description = nlp_result.get('local')
+    amount = nlp_result.get('valor')
+    transaction_date = nlp_result.get('data')
+    if not all([category, description, amount, transaction_date]):
+        raise JobError('Não foi possível extrair todos os dados do áudio.')
+    if not category_id:
+        raise JobError(f"Categoria '{category}' não encontrada para este usuário.")
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        change_seq = next_change_seq(cursor, user_id)
+        bill = repository.create_bill(conn, user_id, category_id, description, amount, transaction_date, change_seq)
+        if not bill:
+            conn.rollback()
+            raise JobError(f"Categoria '{category}' não encontrada para este usuário.")
+        refresh_budget_history(cursor, user_id, [(category_id, transaction_date)])
+        conn.commit()
+        invalidate_budget_summary(user_id)
+        return bill
+    except mysql.connector.Error as err:
+        conn.rollback()
+        raise JobError(f'Erro no banco de dados: {err}')
+    finally:
+        close_db_connection(conn)
@@ -0,0 +1,117 @@
+import re
+import threading
+from datetime import date, timedelta
+from config import Config
+
+try:
+    import spacy
+except ImportError:
+    spacy = None
+
+PADRAO_DATA = re.compile(r"\b(?:anteontem|ontem|hoje|dia (\d{1,2})(?:/(\d{1,2}))?)\b")
+DIAS_RELATIVOS = {"hoje": 0, "ontem": 1, "anteontem": 2}
+ROTULOS_LOCAL = ("LOC", "ORG")
+
+NUMEROS = {
+    "zero": 0, "um": 1, "uma": 1, "dois": 2, "duas": 2, "tres": 3, "quatro": 4, "cinco": 5,
+    "seis": 6, "sete": 7, "oito": 8, "nove": 9, "dez": 10, "onze": 11, "doze": 12, "treze": 13,
+    "quatorze": 14, "catorze": 14, "quinze": 15, "dezesseis": 16, "dezessete": 17, "dezoito": 18,
+    "dezenove": 19, "vinte": 20, "trinta": 30, "quarenta": 40, "cinquenta": 50, "sessenta": 60,
+    "setenta": 70, "oitenta": 80, "noventa": 90, "cem": 100, "cento": 100, "duzentos": 200,
+    "duzentas": 200, "trezentos": 300, "trezentas": 300, "quatrocentos": 400, "quatrocentas": 400,
+    "quinhentos": 500, "quinhentas": 500, "seiscentos": 600, "seiscentas": 600, "setecentos": 700,
+    "setecentas": 700, "oitocentos": 800, "oitocentas": 800, "novecentos": 900, "novecentas": 900,
+}
+MOEDA = {"real", "reais", "rs", "conto", "contos", "pila", "pilas"}
+CENTAVOS = {"centavo", "centavos"}
+
+_nlp = None
+_nlp_lock = threading.Lock()
+
+
+def carregar_modelo():
+    """Carrega o modelo uma vez por processo, sem os componentes que a extração não usa."""
+    global _nlp
+    if _nlp is None:
+        with _nlp_lock:
+            if _nlp is None:
+                if spacy is None:
+                    raise RuntimeError("NLP_MODE=spacy requer o pacote spacy e o modelo pt_core_news_lg.")
+                _nlp = spacy.load(Config.SPACY_MODEL, exclude=Config.SPACY_EXCLUDE)
+    return _nlp
+
+
+def extrair_data(frase_dobrada: str, hoje: date = None):
+    """Retorna (data, (inicio, fim)) da primeira expressão de data da frase, ou (None, None)."""
+    hoje = hoje or date.today()
+    match = PADRAO_DATA.search(frase_dobrada)
+    if not match:
+        return None, None
+    if match.group(1) is None:
+        return hoje - timedelta(days=DIAS_RELATIVOS[match.group(0)]), match.span()
+
+    dia = int(match.group(1))
+    mes = int(match.group(2)) if match.group(2) else hoje.month
+    ano = hoje.year
+    # "dia 28" dito no dia 3 se refere ao mês anterior.
+    if (mes, dia) > (hoje.month, hoje.day):
+        if match.group(2):
+            ano -= 1
+        else:
+            mes, ano = (mes - 1, ano) if mes > 1 else (12, ano - 1)
+    try:
+        return date(ano, mes, dia), match.span()
+    except ValueError:
+        return None, None
+
+
+def _numero(tokens, inicio):
+    """Lê um número por extenso a partir de tokens[inicio]; retorna (valor, próximo índice)."""
+    total, atual, i, lido = 0, 0, inicio, False
+    while i < len(tokens):
+        token = tokens[i]
+        if token in NUMEROS:
+            atual += NUMEROS[token]
+            lido = True
+        elif token == "mil":
+            total += (atual or 1) * 1000
+            atual = 0
+            lido = True
+        elif not (token == "e" and lido and i + 1 < len(tokens) and tokens[i + 1] in NUMEROS):
+            break
+        i += 1
+    return (total + atual, i) if lido else (None, inicio)
+
+
+def valor_por_extenso(tokens: list):
+    """Retorna (valor, índice do primeiro token do valor) ou (None, None).
+
+    Ex.: ["vinte", "e", "cinco", "reais", "e", "dez", "centavos"] -> (25.10, 0)
+    """
+    avulso = (None, None)
+    inicio = 0
+    while inicio < len(tokens):
+        inteiro, i = _numero(tokens, inicio)
+        if inteiro is None:
+            inicio += 1
+            continue
+        if i < len(tokens) and tokens[i] in CENTAVOS:
+            return round(inteiro / 100, 2), inicio
+        if i < len(tokens) and tokens[i] in MOEDA:
+            if i + 2 < len(tokens) and tokens[i + 1] == "e":
+                centavos, j = _numero(tokens, i + 2)
+                if centavos is not None and j < len(tokens) and tokens[j] in CENTAVOS:
+                    return round(inteiro + centavos / 100, 2), inicio
+            return float(inteiro), inicio
+        # Sem moeda, fica o último número citado; "um"/"uma" soltos costumam ser artigos.
+        if not (i == inicio + 1 and tokens[inicio] in ("um", "uma")):
+            avulso = (float(inteiro), inicio)
+        inicio = i
+    return avulso
+
+
+def extrair_local(doc):
+    for ent in doc.ents:
+        if ent.label_ in ROTULOS_LOCAL:
+            return ent.text
+    return None
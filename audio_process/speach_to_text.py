@@ -1,11 +1,21 @@
 import os
 import json
+import threading
+import itertools
+import subprocess
 from google.cloud import speech
+from google.cloud.speech_v1.services.speech.transports import SpeechGrpcTransport
 from dotenv import load_dotenv
 from pathlib import Path
 import tempfile
+import grpc
+from google.api_core.exceptions import GoogleAPICallError
 from pydub import AudioSegment
 import uuid
+from abc import ABC, abstractmethod
+from config import Config
+from audio_process.transcription_cache import CacheTranscricao
+from utils.metrics import time_external_call
 
 load_dotenv(dotenv_path=Path(__file__).resolve().parent.parent / ".env", override=True)
 
@@ -14,77 +24,353 @@ if os.getenv("GOOGLE_APPLICATION_CREDENTIALS_JSON"):
     with tempfile.NamedTemporaryFile(delete=False, suffix=".json") as f:
         f.write(os.getenv("GOOGLE_APPLICATION_CREDENTIALS_JSON").encode())
         os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = f.name
-else:
+elif os.getenv("GOOGLE_APPLICATION_CREDENTIALS"):
     os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
 
 
-class TranscritorGoogle:
-    def __init__(self):
-        self.client = speech.SpeechClient()
+class ErroConversaoAudio(Exception):
+    pass
 
-    def convert_to_ogg(self, input_path: str) -> (str, int, int):
-        output_path = f"/tmp/{uuid.uuid4().hex}.ogg"
-        audio = AudioSegment.from_file(input_path)
 
-        audio = audio.set_channels(1).set_frame_rate(16000)
+class Transcritor(ABC):
+    """Interface dos transcritores: converte o áudio e delega o reconhecimento a reconhecer()."""
 
-        audio.export(output_path, format="ogg", codec="libopus")
+    SAMPLE_RATE = 16000
+    CHANNELS = 1
+    # 100 ms de LINEAR16 mono a 16 kHz.
+    BLOCO_PCM = SAMPLE_RATE * 2 // 10
+    # Segundos de espera pela thread que alimenta o ffmpeg; ela pode estar presa lendo o upload.
+    ESPERA_ALIMENTADOR = 5
 
-        return output_path, 16000, 1
+    def __init__(self, cache: CacheTranscricao = None):
+        self.cache = cache
 
+    def _ffmpeg(self, entrada: str, conteudo: bytes = None) -> subprocess.CompletedProcess:
+        comando = [
+            AudioSegment.converter, "-hide_banner", "-loglevel", "error",
+            "-i", entrada,
+            "-ac", str(self.CHANNELS), "-ar", str(self.SAMPLE_RATE),
+            "-c:a", "libopus",
+            # Without bitexact the Ogg stream serial is random, and the cache key would never repeat.
+            "-fflags", "+bitexact", "-flags:a", "+bitexact",
+            "-f", "ogg", "pipe:1",
+        ]
+        return subprocess.run(comando, input=conteudo, capture_output=True)
 
-    def transcrever(self, caminho_audio: str, saida_json: str = "transcricao.json") -> dict:
-        ogg_path, sample_rate, channels = self.convert_to_ogg(caminho_audio)
+    def converter_para_opus(self, conteudo: bytes) -> (bytes, int, int):
+        with time_external_call("audio_conversion"):
+            # pydub's export always round-trips through a temporary file, so ffmpeg is piped directly.
+            processo = self._ffmpeg("pipe:0", conteudo)
+            if processo.returncode != 0 or not processo.stdout:
+                # Containers with the index at the end (e.g. m4a from iOS) cannot be read from a pipe.
+                with tempfile.NamedTemporaryFile() as entrada:
+                    entrada.write(conteudo)
+                    entrada.flush()
+                    processo = self._ffmpeg(entrada.name)
+            if processo.returncode != 0 or not processo.stdout:
+                raise ErroConversaoAudio(processo.stderr.decode("utf-8", "replace").strip())
+        return processo.stdout, self.SAMPLE_RATE, self.CHANNELS
+
+    def converter_stream_para_pcm(self, blocos):
+        """Converte o áudio enquanto ele chega, gerando blocos LINEAR16 de ~100 ms.
+
+        Só funciona com formatos que o ffmpeg lê de um pipe (webm, ogg, wav); m4a não.
+        """
+        comando = [
+            AudioSegment.converter, "-hide_banner", "-loglevel", "error",
+            "-i", "pipe:0",
+            "-ac", str(self.CHANNELS), "-ar", str(self.SAMPLE_RATE),
+            "-f", "s16le", "pipe:1",
+        ]
+        processo = subprocess.Popen(comando, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        parar = threading.Event()
+        erros = []
 
+        def alimentar():
+            try:
+                for bloco in blocos:
+                    if parar.is_set():
+                        break
+                    processo.stdin.write(bloco)
+                    processo.stdin.flush()
+            except BrokenPipeError:
+                pass
+            except Exception as err:
+                # E.g. the upload went over its size limit: stop ffmpeg so the reader sees EOF now
+                # and re-raises this error in the consuming thread.
+                erros.append(err)
+                processo.kill()
+            finally:
+                try:
+                    processo.stdin.close()
+                except OSError:
+                    pass
+
+        # stdin is fed from another thread so ffmpeg's output can be read while the upload is still arriving.
+        alimentador = threading.Thread(target=alimentar, daemon=True)
+        alimentador.start()
+        gerou = False
         try:
-            with open(ogg_path, "rb") as f:
-                conteudo = f.read()
-
-            audio = speech.RecognitionAudio(content=conteudo)
-
-            config = speech.RecognitionConfig(
-                encoding=speech.RecognitionConfig.AudioEncoding.OGG_OPUS,
-                sample_rate_hertz=sample_rate,
-                language_code="pt-BR",
-                model="latest_short",
-                audio_channel_count=channels,
-                enable_word_confidence=True,
-                enable_word_time_offsets=True
-            )
-
-            operation = self.client.long_running_recognize(config=config, audio=audio)
-
-            print("Aguardando a conclusão da transcrição...")
-            response = operation.result(timeout=180)
-
-            resultados = []
-            for resultado in response.results:
-                alternativas = []
-                for alt in resultado.alternatives:
-                    alternativas.append({
-                        "transcricao": alt.transcript,
-                        "confianca": alt.confidence,
-                        "palavras": [
-                            {
-                                "texto": w.word,
-                                "inicio": w.start_time.total_seconds(),
-                                "fim": w.end_time.total_seconds(),
-                                "confianca": getattr(w, "confidence", None),
-                            }
-                            for w in alt.words
-                        ]
-                    })
-                resultados.append({"alternativas": alternativas})
-
-            with open(saida_json, "w", encoding="utf-8") as f:
-                json.dump({"resultados": resultados}, f, ensure_ascii=False, indent=2)
-
-            print(f"Transcrição salva em {saida_json}")
-            return {"resultados": resultados}
+            while True:
+                pcm = processo.stdout.read(self.BLOCO_PCM)
+                if not pcm:
+                    break
+                gerou = True
+                yield pcm
+            alimentador.join(self.ESPERA_ALIMENTADOR)
+            if erros:
+                raise erros[0]
+            if processo.wait() != 0 and not gerou:
+                raise ErroConversaoAudio(processo.stderr.read().decode("utf-8", "replace").strip())
+        finally:
+            parar.set()
+            if processo.poll() is None:
+                processo.kill()
+            processo.wait()
+            # Closing the pipes first makes a feeder blocked on stdin fail instead of hanging; one
+            # blocked reading the upload is a daemon thread and is left behind after the timeout.
+            for pipe in (processo.stdin, processo.stdout):
+                try:
+                    pipe.close()
+                except OSError:
+                    pass
+            alimentador.join(self.ESPERA_ALIMENTADOR)
+            processo.stderr.close()
+
+    @abstractmethod
+    def reconhecer(self, conteudo: bytes, sample_rate: int, channels: int) -> list:
+        """Reconhece o áudio já convertido (Ogg/Opus) e devolve a lista de resultados."""
+
+    def transcrever_stream(self, blocos):
+        """Gera {"transcricao", "final", "estabilidade"} conforme o áudio chega.
+
+        Sem suporte a streaming no backend, espera o áudio inteiro e gera só o resultado final.
+        """
+        resultados = self.transcrever_bytes(b"".join(blocos))["resultados"]
+        transcricao = " ".join(
+            r["alternativas"][0]["transcricao"] for r in resultados if r["alternativas"]
+        )
+        yield {"transcricao": transcricao, "final": True, "estabilidade": 1.0}
+
+    def config_reconhecimento(self, sample_rate: int, channels: int) -> dict:
+        return {"backend": type(self).__name__, "sample_rate": sample_rate, "channels": channels}
+
+    def transcrever_bytes(self, conteudo: bytes, nome_debug: str = None) -> dict:
+        opus, sample_rate, channels = self.converter_para_opus(conteudo)
+
+        resultados = None
+        if self.cache:
+            chave = self.cache.chave(opus, self.config_reconhecimento(sample_rate, channels))
+            resultados = self.cache.get(chave)
+        if resultados is None:
+            with time_external_call("speech_recognition"):
+                resultados = self.reconhecer(opus, sample_rate, channels)
+            if self.cache:
+                self.cache.set(chave, resultados)
+        transcricao = {"resultados": resultados}
+
+        if Config.AUDIO_DEBUG_DIR:
+            nome = f"{nome_debug or 'audio'}-{uuid.uuid4().hex}.json"
+            caminho = os.path.join(Config.AUDIO_DEBUG_DIR, nome)
+            with open(caminho, "w", encoding="utf-8") as f:
+                json.dump(transcricao, f, ensure_ascii=False, indent=2)
+            print(f"Transcrição salva em {caminho}")
+        return transcricao
+
+    def transcrever(self, caminho_audio: str, saida_json: str = "transcricao.json") -> dict:
+        with open(caminho_audio, "rb") as f:
+            transcricao = self.transcrever_bytes(f.read())
+
+        with open(saida_json, "w", encoding="utf-8") as f:
+            json.dump(transcricao, f, ensure_ascii=False, indent=2)
+
+        print(f"Transcrição salva em {saida_json}")
+        return transcricao
+
+
+def criar_speech_client():
+    if Config.SPEECH_API_ENDPOINT:
+        # Servidor local sem TLS, ex.: python -m audio_process.fake_speech_server
+        channel = grpc.insecure_channel(Config.SPEECH_API_ENDPOINT, options=_channel_options())
+    else:
+        channel = SpeechGrpcTransport.create_channel(options=_channel_options())
+    return speech.SpeechClient(transport=SpeechGrpcTransport(channel=channel))
+
+
+def _channel_options():
+    return [
+        ("grpc.keepalive_time_ms", Config.SPEECH_KEEPALIVE_MS),
+        ("grpc.keepalive_timeout_ms", 20000),
+        ("grpc.keepalive_permit_without_calls", 1),
+        ("grpc.http2.max_pings_without_data", 0),
+    ]
+
+
+_speech_client = None
+_speech_client_pid = None
+_speech_client_lock = threading.Lock()
+
+
+def get_speech_client():
+    # gRPC channels do not survive fork(); each gunicorn worker builds its own on first use.
+    global _speech_client, _speech_client_pid
+    pid = os.getpid()
+    if _speech_client is None or _speech_client_pid != pid:
+        with _speech_client_lock:
+            if _speech_client is None or _speech_client_pid != pid:
+                _speech_client = criar_speech_client()
+                _speech_client_pid = pid
+    return _speech_client
 
+
+class TranscritorGoogle(Transcritor):
+    def __init__(self, client=None, cache: CacheTranscricao = None):
+        super().__init__(cache)
+        self._client = client
+
+    @property
+    def client(self):
+        return self._client or get_speech_client()
+
+    def _recognition_config(self, sample_rate: int, channels: int) -> speech.RecognitionConfig:
+        return speech.RecognitionConfig(
+            encoding=speech.RecognitionConfig.AudioEncoding.OGG_OPUS,
+            sample_rate_hertz=sample_rate,
+            language_code="pt-BR",
+            model="latest_short",
+            audio_channel_count=channels,
+            enable_word_confidence=True,
+            enable_word_time_offsets=True
+        )
+
+    def _streaming_config(self) -> speech.StreamingRecognitionConfig:
+        config = speech.RecognitionConfig(
+            encoding=speech.RecognitionConfig.AudioEncoding.LINEAR16,
+            sample_rate_hertz=self.SAMPLE_RATE,
+            language_code="pt-BR",
+            model="latest_short",
+            audio_channel_count=self.CHANNELS
+        )
+        return speech.StreamingRecognitionConfig(config=config, interim_results=True)
+
+    def config_reconhecimento(self, sample_rate: int, channels: int) -> dict:
+        config = speech.RecognitionConfig.to_dict(self._recognition_config(sample_rate, channels))
+        return {"backend": "google", **config}
+
+    def reconhecer(self, conteudo: bytes, sample_rate: int, channels: int) -> list:
+        audio = speech.RecognitionAudio(content=conteudo)
+        config = self._recognition_config(sample_rate, channels)
+
+        operation = self.client.long_running_recognize(config=config, audio=audio)
+
+        print("Aguardando a conclusão da transcrição...")
+        response = operation.result(timeout=180)
+
+        resultados = []
+        for resultado in response.results:
+            alternativas = []
+            for alt in resultado.alternatives:
+                alternativas.append({
+                    "transcricao": alt.transcript,
+                    "confianca": alt.confidence,
+                    "palavras": [
+                        {
+                            "texto": w.word,
+                            "inicio": w.start_time.total_seconds(),
+                            "fim": w.end_time.total_seconds(),
+                            "confianca": getattr(w, "confidence", None),
+                        }
+                        for w in alt.words
+                    ]
+                })
+            resultados.append({"alternativas": alternativas})
+        return resultados
+
+    def transcrever_stream(self, blocos):
+        erros = []
+
+        def requisicoes():
+            try:
+                for pcm in self.converter_stream_para_pcm(blocos):
+                    yield speech.StreamingRecognizeRequest(audio_content=pcm)
+            except Exception as err:
+                # gRPC iterates the requests in its own thread and reports any error there as a
+                # cancelled call; the original one is kept to be re-raised to the caller.
+                erros.append(err)
+                raise
+
+        respostas = self.client.streaming_recognize(
+            config=self._streaming_config(), requests=requisicoes(), timeout=Config.SPEECH_STREAM_TIMEOUT
+        )
+        try:
+            for resposta in respostas:
+                for resultado in resposta.results:
+                    if resultado.alternatives:
+                        yield {
+                            "transcricao": resultado.alternatives[0].transcript,
+                            "final": resultado.is_final,
+                            "estabilidade": resultado.stability,
+                        }
+        except GoogleAPICallError as err:
+            if erros:
+                raise erros[0] from err
+            raise
         finally:
-            if os.path.exists(ogg_path):
-                os.remove(ogg_path)
+            # The caller may stop at the first final result; the rest of the call is not needed.
+            respostas.cancel()
+
+
+class TranscritorFake(Transcritor):
+    """Devolve transcrições fixas, em rodízio, sem acessar a rede. Útil para testes de carga."""
+
+    def __init__(self, transcricoes=None, cache: CacheTranscricao = None):
+        super().__init__(cache)
+        self._transcricoes = itertools.cycle(transcricoes or ["mercado 50 reais"])
+        self._lock = threading.Lock()
+
+    def reconhecer(self, conteudo: bytes, sample_rate: int, channels: int) -> list:
+        with self._lock:
+            transcricao = next(self._transcricoes)
+        return [{"alternativas": [{"transcricao": transcricao, "confianca": 1.0, "palavras": []}]}]
+
+    def transcrever_stream(self, blocos):
+        with self._lock:
+            transcricao = next(self._transcricoes)
+        palavras = transcricao.split()
+        # Uma palavra a mais a cada bloco de áudio, como os resultados parciais da API.
+        for i, _ in enumerate(self.converter_stream_para_pcm(blocos), start=1):
+            if i < len(palavras):
+                yield {"transcricao": " ".join(palavras[:i]), "final": False, "estabilidade": 0.5}
+        yield {"transcricao": transcricao, "final": True, "estabilidade": 1.0}
+
+
+TRANSCRITORES = {
+    "google": lambda cache: TranscritorGoogle(cache=cache),
+    "fake": lambda cache: TranscritorFake(Config.FAKE_TRANSCRIPTS, cache=cache),
+}
+
+_transcritor = None
+_transcritor_lock = threading.Lock()
+
+
+def get_transcritor() -> Transcritor:
+    global _transcritor
+    if _transcritor is None:
+        with _transcritor_lock:
+            if _transcritor is None:
+                if Config.TRANSCRIBER_BACKEND not in TRANSCRITORES:
+                    raise ValueError(f"TRANSCRIBER_BACKEND desconhecido: {Config.TRANSCRIBER_BACKEND}")
+                cache = None
+                if Config.TRANSCRIPTION_CACHE_SIZE > 0:
+                    cache = CacheTranscricao(
+                        maxsize=Config.TRANSCRIPTION_CACHE_SIZE,
+                        ttl=Config.TRANSCRIPTION_CACHE_TTL,
+                        disk_dir=Config.TRANSCRIPTION_CACHE_DIR,
+                        disk_max_entries=Config.TRANSCRIPTION_CACHE_DISK_MAX_ENTRIES,
+                        intervalo_limpeza=Config.TRANSCRIPTION_CACHE_CLEANUP_INTERVAL
+                    )
+                _transcritor = TRANSCRITORES[Config.TRANSCRIBER_BACKEND](cache=cache)
+    return _transcritor
 
 
 if __name__ == "__main__":
@@ -0,0 +1,129 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from cachetools import TTLCache
+
+
+class CacheTranscricao:
+    """Cache de transcrições endereçado pelo conteúdo: memória (LRU + TTL) e, opcionalmente, disco.
+
+    O nível em disco é compartilhado entre os workers do gunicorn da mesma máquina. A cada
+    intervalo_limpeza segundos uma gravação dispara, em segundo plano, a remoção dos arquivos
+    expirados e dos mais antigos além de disk_max_entries.
+    """
+
+    def __init__(self, maxsize=256, ttl=86400, disk_dir=None, disk_max_entries=10000, intervalo_limpeza=600):
+        self.ttl = ttl
+        self.disk_dir = disk_dir
+        self.disk_max_entries = disk_max_entries
+        self.intervalo_limpeza = intervalo_limpeza
+        self._proxima_limpeza = 0.0
+        self._memoria = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self.hits_memoria = 0
+        self.hits_disco = 0
+        self.misses = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    @staticmethod
+    def chave(conteudo: bytes, config: dict) -> str:
+        digest = hashlib.sha256(json.dumps(config, sort_keys=True).encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(conteudo)
+        return digest.hexdigest()
+
+    def _caminho(self, chave):
+        return os.path.join(self.disk_dir, chave[:2], f"{chave}.json")
+
+    def _ler_disco(self, chave):
+        caminho = self._caminho(chave)
+        try:
+            if time.time() - os.path.getmtime(caminho) > self.ttl:
+                os.remove(caminho)
+                return None
+            with open(caminho, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _gravar_disco(self, chave, resultados):
+        caminho = self._caminho(chave)
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        # Written to a temporary file and renamed so another worker never reads half a file.
+        fd, temporario = tempfile.mkstemp(dir=os.path.dirname(caminho), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(resultados, f, ensure_ascii=False)
+            os.replace(temporario, caminho)
+        except OSError:
+            if os.path.exists(temporario):
+                os.remove(temporario)
+
+    def _limpar_disco(self):
+        agora = time.time()
+        arquivos = []
+        for pasta, _, nomes in os.walk(self.disk_dir):
+            for nome in nomes:
+                caminho = os.path.join(pasta, nome)
+                try:
+                    modificado = os.path.getmtime(caminho)
+                    # Leftover .tmp files come from a worker that died mid-write.
+                    if agora - modificado > self.ttl or (nome.endswith(".tmp") and agora - modificado > 60):
+                        os.remove(caminho)
+                    elif nome.endswith(".json"):
+                        arquivos.append((modificado, caminho))
+                except OSError:
+                    # Another worker cleaning the same directory got there first.
+                    continue
+        if self.disk_max_entries and len(arquivos) > self.disk_max_entries:
+            arquivos.sort()
+            for _, caminho in arquivos[:len(arquivos) - self.disk_max_entries]:
+                try:
+                    os.remove(caminho)
+                except OSError:
+                    pass
+
+    def _agendar_limpeza(self):
+        agora = time.time()
+        with self._lock:
+            if agora < self._proxima_limpeza:
+                return
+            self._proxima_limpeza = agora + self.intervalo_limpeza
+        threading.Thread(target=self._limpar_disco, name="limpeza-cache-transcricao", daemon=True).start()
+
+    def get(self, chave):
+        with self._lock:
+            resultados = self._memoria.get(chave)
+            if resultados is not None:
+                self.hits_memoria += 1
+                return resultados
+        if self.disk_dir:
+            resultados = self._ler_disco(chave)
+            if resultados is not None:
+                with self._lock:
+                    self._memoria[chave] = resultados
+                    self.hits_disco += 1
+                return resultados
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, chave, resultados):
+        with self._lock:
+            self._memoria[chave] = resultados
+        if self.disk_dir:
+            self._gravar_disco(chave, resultados)
+            self._agendar_limpeza()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits_memoria": self.hits_memoria,
+                "hits_disco": self.hits_disco,
+                "misses": self.misses,
+                "itens_memoria": len(self._memoria),
+            }
@@ -0,0 +1,166 @@
+import argparse
+import sys
+import time
+from datetime import date
+import mysql.connector
+from config import Config
+from db import get_db_connection, close_db_connection
+from utils.budget_history import rebuild_budget_history_job
+from utils.budget_summary import parse_period, next_month
+from utils.job_queue import JobError
+
+SELECT_BATCH = """
+    SELECT id FROM users
+    WHERE cumulative_budget = 1 AND id > %s
+    ORDER BY id
+    LIMIT %s"""
+
+# sp_execute_monthly_closing restricted to a range of users, and an upsert so a rerun for the same
+# period rewrites the rows instead of failing on category_period_UNIQUE. The opening balance is the
+# last closed month, which is not necessarily the previous calendar month.
+CLOSE_BATCH = """
+    INSERT INTO monthly_budget_history (category_id, period, base_budget, monthly_spend, starting_balance, ending_balance)
+    SELECT
+        spendings.category_id,
+        %s,
+        spendings.budget_amount,
+        spendings.total_spend,
+        spendings.opening,
+        spendings.opening + spendings.budget_amount - spendings.total_spend
+    FROM (
+        SELECT
+            c.id AS category_id,
+            IFNULL(c.budget_amount, 0) AS budget_amount,
+            SUM(b.amount) AS total_spend,
+            IFNULL((SELECT h.ending_balance FROM monthly_budget_history h
+                    WHERE h.category_id = c.id AND h.period < %s
+                    ORDER BY h.period DESC LIMIT 1), 0) AS opening
+        FROM categories c
+        JOIN users u ON u.id = c.user_id
+        JOIN bills b ON b.category_id = c.id
+        WHERE u.cumulative_budget = 1
+          AND c.user_id BETWEEN %s AND %s
+          AND b.transaction_date >= %s
+          AND b.transaction_date < %s
+        GROUP BY c.id, c.budget_amount
+    ) AS spendings
+    ON DUPLICATE KEY UPDATE
+        base_budget = VALUES(base_budget),
+        monthly_spend = VALUES(monthly_spend),
+        starting_balance = VALUES(starting_balance),
+        ending_balance = VALUES(ending_balance)"""
+
+
+class ClosingError(Exception):
+    pass
+
+
+def previous_month(today=None):
+    today = today or date.today()
+    return date(today.year - 1, 12, 1) if today.month == 1 else date(today.year, today.month - 1, 1)
+
+
+def _start_run(cursor, period, restart):
+    cursor.execute("INSERT IGNORE INTO monthly_closing_runs (period) VALUES (%s)", (period,))
+    if restart:
+        cursor.execute(
+            """UPDATE monthly_closing_runs
+               SET status = 'running', last_user_id = 0, users_processed = 0,
+                   started_at = CURRENT_TIMESTAMP, finished_at = NULL
+               WHERE period = %s""",
+            (period,)
+        )
+    cursor.execute(
+        "SELECT status, last_user_id, users_processed FROM monthly_closing_runs WHERE period = %s",
+        (period,)
+    )
+    return cursor.fetchone()
+
+
+def run_closing(period, batch_size, restart=False):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT GET_LOCK('monthly_closing', 10)")
+        if cursor.fetchone()[0] != 1:
+            raise ClosingError('Outro fechamento está em andamento.')
+        try:
+            status, last_user_id, processed = _start_run(cursor, period, restart)
+            conn.commit()
+            label = period.strftime('%Y-%m')
+            if status == 'done':
+                print(f"Fechamento de {label} já concluído ({processed} usuários). Use --restart para refazer.")
+                return
+            if last_user_id:
+                print(f"Retomando o fechamento de {label} após o usuário {last_user_id}.")
+
+            period_end = next_month(period)
+            batch = 0
+            total_start = time.perf_counter()
+            while True:
+                cursor.execute(SELECT_BATCH, (last_user_id, batch_size))
+                user_ids = [row[0] for row in cursor.fetchall()]
+                if not user_ids:
+                    break
+                batch += 1
+                start = time.perf_counter()
+                cursor.execute(CLOSE_BATCH, (period, period, user_ids[0], user_ids[-1], period, period_end))
+                rows = cursor.rowcount
+                last_user_id = user_ids[-1]
+                processed += len(user_ids)
+                # The checkpoint commits with the batch, so a crash never skips or half-applies one.
+                cursor.execute(
+                    "UPDATE monthly_closing_runs SET last_user_id = %s, users_processed = %s WHERE period = %s",
+                    (last_user_id, processed, period)
+                )
+                conn.commit()
+                elapsed_ms = int((time.perf_counter() - start) * 1000)
+                print(f"Lote {batch}: usuários {user_ids[0]}..{last_user_id} ({len(user_ids)}), "
+                      f"{rows} linha(s) afetada(s) em {elapsed_ms} ms.")
+
+            cursor.execute(
+                "UPDATE monthly_closing_runs SET status = 'done', finished_at = CURRENT_TIMESTAMP WHERE period = %s",
+                (period,)
+            )
+            conn.commit()
+            elapsed = time.perf_counter() - total_start
+            print(f"Fechamento de {label} concluído: {processed} usuários, {batch} lote(s) em {elapsed:.2f}s.")
+        except mysql.connector.Error:
+            conn.rollback()
+            raise
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK('monthly_closing')")
+            cursor.fetchall()
+    finally:
+        close_db_connection(conn)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fechamento mensal do orçamento cumulativo.")
+    parser.add_argument('--period', help="Mês a fechar, YYYY-MM (padrão: mês anterior).")
+    parser.add_argument('--batch-size', type=int, default=Config.CLOSING_BATCH_SIZE)
+    parser.add_argument('--restart', action='store_true', help="Refaz o mês desde o início, mesmo se já concluído.")
+    parser.add_argument('--rebuild-user', type=int, metavar='USER_ID',
+                        help="Em vez de fechar um mês, reconstrói todo o histórico do usuário (reparo).")
+    args = parser.parse_args()
+
+    if args.rebuild_user:
+        try:
+            rebuild_budget_history_job({'user_id': args.rebuild_user})
+        except JobError as err:
+            print(f"Erro: {err}")
+            sys.exit(1)
+        print(f"Histórico do usuário {args.rebuild_user} reconstruído.")
+        sys.exit(0)
+
+    try:
+        period = parse_period(args.period) if args.period else previous_month()
+    except ValueError:
+        print("Erro: período inválido, use o formato YYYY-MM.")
+        sys.exit(1)
+
+    try:
+        run_closing(period, args.batch_size, args.restart)
+    except (ClosingError, mysql.connector.Error) as err:
+        print(f"Erro: {err}")
+        sys.exit(1)
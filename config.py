@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -8,7 +9,67 @@ class Config:
     MYSQL_USER = os.getenv('MYSQL_USER')
     MYSQL_PASSWORD = os.getenv('MYSQL_PASSWORD')
     MYSQL_DB = os.getenv('MYSQL_DATABASE')
+
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 5))
+    DB_POOL_MAX_OVERFLOW = int(os.getenv('DB_POOL_MAX_OVERFLOW', 10))
+    DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 30))
+    DB_POOL_IDLE_TIMEOUT = float(os.getenv('DB_POOL_IDLE_TIMEOUT', 300))
+    DB_POOL_RECYCLE = float(os.getenv('DB_POOL_RECYCLE', 3600))
+    DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() == 'true'
+    DB_PREPARED_CACHE_SIZE = int(os.getenv('DB_PREPARED_CACHE_SIZE', 64))
+
+    MIGRATION_LOCK_WAIT_TIMEOUT = int(os.getenv('MIGRATION_LOCK_WAIT_TIMEOUT', 10))
     
+    BILLS_PAGE_MAX_LIMIT = int(os.getenv('BILLS_PAGE_MAX_LIMIT', 500))
+    BILLS_STREAM_CHUNK_SIZE = int(os.getenv('BILLS_STREAM_CHUNK_SIZE', 500))
+    BILLS_BULK_MAX_SIZE = int(os.getenv('BILLS_BULK_MAX_SIZE', 500))
+    TEXT_BATCH_MAX_SIZE = int(os.getenv('TEXT_BATCH_MAX_SIZE', 500))
+    EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', 10000))
+    EXPORT_NET_WRITE_TIMEOUT = int(os.getenv('EXPORT_NET_WRITE_TIMEOUT', 600))
+    SLOW_REQUEST_THRESHOLD = float(os.getenv('SLOW_REQUEST_THRESHOLD', 1.0))
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+    GZIP_MIN_SIZE = int(os.getenv('GZIP_MIN_SIZE', 1400))
+    GZIP_LEVEL = int(os.getenv('GZIP_LEVEL', 6))
+
+    IMPORT_CHUNK_SIZE = int(os.getenv('IMPORT_CHUNK_SIZE', 1000))
+    IMPORT_WORKERS = int(os.getenv('IMPORT_WORKERS', 2))
+    IMPORT_MAX_BYTES = int(os.getenv('IMPORT_MAX_BYTES', 50 * 1024 * 1024))
+
+    JOB_QUEUE_BACKEND = os.getenv('JOB_QUEUE_BACKEND', 'sqlite')
+    JOB_QUEUE_PATH = os.getenv('JOB_QUEUE_PATH', os.path.join(tempfile.gettempdir(), 'bills_jobs.sqlite3'))
+    JOB_WORKERS = int(os.getenv('JOB_WORKERS', 2))
+    JOB_QUEUE_MAX_PENDING = int(os.getenv('JOB_QUEUE_MAX_PENDING', 100))
+    JOB_RETENTION_SECONDS = int(os.getenv('JOB_RETENTION_SECONDS', 86400))
+    JOB_STALE_AFTER = int(os.getenv('JOB_STALE_AFTER', 600))
+
+    TRANSCRIBER_BACKEND = os.getenv('TRANSCRIBER_BACKEND', 'google')
+    FAKE_TRANSCRIPTS = [t for t in os.getenv('FAKE_TRANSCRIPTS', 'mercado 50 reais').split('|') if t]
+    SPEECH_API_ENDPOINT = os.getenv('SPEECH_API_ENDPOINT')
+    SPEECH_KEEPALIVE_MS = int(os.getenv('SPEECH_KEEPALIVE_MS', 300000))
+    AUDIO_DEBUG_DIR = os.getenv('AUDIO_DEBUG_DIR')
+    AUDIO_STREAM_CHUNK_SIZE = int(os.getenv('AUDIO_STREAM_CHUNK_SIZE', 4096))
+    AUDIO_STREAM_MAX_BYTES = int(os.getenv('AUDIO_STREAM_MAX_BYTES', 10 * 1024 * 1024))
+    SPEECH_STREAM_TIMEOUT = float(os.getenv('SPEECH_STREAM_TIMEOUT', 300))
+    TRANSCRIPTION_CACHE_SIZE = int(os.getenv('TRANSCRIPTION_CACHE_SIZE', 256))
+    TRANSCRIPTION_CACHE_TTL = int(os.getenv('TRANSCRIPTION_CACHE_TTL', 86400))
+    TRANSCRIPTION_CACHE_DIR = os.getenv('TRANSCRIPTION_CACHE_DIR')
+    TRANSCRIPTION_CACHE_DISK_MAX_ENTRIES = int(os.getenv('TRANSCRIPTION_CACHE_DISK_MAX_ENTRIES', 10000))
+    TRANSCRIPTION_CACHE_CLEANUP_INTERVAL = int(os.getenv('TRANSCRIPTION_CACHE_CLEANUP_INTERVAL', 600))
+
+    CATEGORY_CACHE_TTL = int(os.getenv('CATEGORY_CACHE_TTL', 300))
+    BUDGET_SUMMARY_CACHE_TTL = int(os.getenv('BUDGET_SUMMARY_CACHE_TTL', 60))
+    BUDGET_SUMMARY_MAX_MONTHS = int(os.getenv('BUDGET_SUMMARY_MAX_MONTHS', 24))
+    CLOSING_BATCH_SIZE = int(os.getenv('CLOSING_BATCH_SIZE', 200))
+
+    NLP_MODE = os.getenv('NLP_MODE', 'regex')
+    SPACY_MODEL = os.getenv('SPACY_MODEL', 'pt_core_news_lg')
+    SPACY_EXCLUDE = [c for c in os.getenv('SPACY_EXCLUDE', 'parser,lemmatizer,morphologizer,attribute_ruler,senter').split(',') if c]
+    SPACY_BATCH_SIZE = int(os.getenv('SPACY_BATCH_SIZE', 64))
+    SPACY_PREWARM = os.getenv('SPACY_PREWARM', 'true').lower() == 'true'
+
     SECRET_KEY = os.getenv('SECRET_KEY')
     
-    BCRYPT_LOG_ROUNDS = 12
\ No newline at end of file
+    BCRYPT_LOG_ROUNDS = int(os.getenv('BCRYPT_LOG_ROUNDS', 12))
+    BCRYPT_WORKERS = int(os.getenv('BCRYPT_WORKERS', os.cpu_count() or 2))
+    BCRYPT_MAX_QUEUE = int(os.getenv('BCRYPT_MAX_QUEUE', 32))
+    BCRYPT_QUEUE_TIMEOUT = float(os.getenv('BCRYPT_QUEUE_TIMEOUT', 5))
\ No newline at end of file
@@ -1,19 +1,323 @@
+import os
+import time
+import threading
+from collections import OrderedDict, deque
 import mysql.connector
+from flask import g, has_app_context
 from config import Config
+from utils.metrics import observe_query
+
+
+class PoolTimeoutError(mysql.connector.errors.PoolError):
+    pass
+
+
+class TimedCursor:
+    """Proxy of a cursor that reports the time of each statement to utils.metrics.
+
+    Only execute/executemany/callproc are timed; rows of an unbuffered cursor fetched later are not.
+    """
+    __slots__ = ('_cursor',)
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def _timed(self, statement, method, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            observe_query(statement, time.perf_counter() - start)
+
+    def execute(self, operation, *args, **kwargs):
+        return self._timed(operation, self._cursor.execute, operation, *args, **kwargs)
+
+    def executemany(self, operation, *args, **kwargs):
+        return self._timed(operation, self._cursor.executemany, operation, *args, **kwargs)
+
+    def callproc(self, procname, *args, **kwargs):
+        return self._timed(f'CALL {procname}', self._cursor.callproc, procname, *args, **kwargs)
+
+
+class PooledConnection:
+    """Proxy around a MySQL connection that returns it to the pool on close()."""
+
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self._raw = raw
+        self._checked_out = False
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self._statements = OrderedDict()
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def cursor(self, *args, **kwargs):
+        return TimedCursor(self._raw.cursor(*args, **kwargs))
+
+    def prepared(self, sql, dictionary=False):
+        """Cursor with sql prepared on the server, reused for as long as this connection lives.
+
+        The connector re-prepares whenever a cursor sees a different operation, so each statement
+        keeps a cursor of its own; pass the same string object (a module constant) every time.
+        """
+        key = (sql, dictionary)
+        cursor = self._statements.get(key)
+        if cursor is not None:
+            self._statements.move_to_end(key)
+            return cursor
+        cursor = self._statements[key] = self.cursor(prepared=True, dictionary=dictionary)
+        if len(self._statements) > Config.DB_PREPARED_CACHE_SIZE:
+            _, oldest = self._statements.popitem(last=False)
+            try:
+                oldest.close()
+            except mysql.connector.Error:
+                pass
+        return cursor
+
+    def _replace_raw(self, raw, now):
+        # Statements belong to the server session; a new socket starts with none.
+        self._statements.clear()
+        self._raw = raw
+        self.created_at = now
+
+    def close(self):
+        self._pool.release(self)
+
+    def invalidate(self):
+        """Tira a conexão do pool sem ler o resultado pendente (ex.: um stream abandonado pelo cliente)."""
+        self._pool.invalidate(self)
+
+
+class ConnectionPool:
+    def __init__(self, size=5, max_overflow=10, timeout=30.0, idle_timeout=300.0,
+                 recycle=3600.0, pre_ping=True, **connect_args):
+        self.size = size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.recycle = recycle
+        self.pre_ping = pre_ping
+        self._connect_args = connect_args
+        self._idle = deque()
+        self._cond = threading.Condition()
+        self._open = 0
+        self._checked_out = 0
+        self._waiting = 0
+        self._acquisitions = 0
+        self._timeouts = 0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+
+    def _connect(self):
+        try:
+            return mysql.connector.connect(**self._connect_args)
+        except mysql.connector.Error as err:
+            print(f"Erro ao conectar ao MySQL: {err}")
+            raise
+
+    def _discard(self, raw):
+        try:
+            raw.close()
+        except mysql.connector.Error:
+            pass
+
+    def _is_expired(self, conn, now):
+        return bool(self.recycle) and now - conn.created_at > self.recycle
+
+    def _take_stale_locked(self, now):
+        # Idle connections are kept LIFO, so the stale ones sit at the left end.
+        stale = []
+        while self._idle and self.idle_timeout and now - self._idle[0].last_used > self.idle_timeout:
+            stale.append(self._idle.popleft())
+            self._open -= 1
+        return stale
+
+    def _prepare(self, conn):
+        now = time.monotonic()
+        if conn is None:
+            return PooledConnection(self, self._connect())
+        if self._is_expired(conn, now):
+            self._discard(conn._raw)
+            conn._replace_raw(self._connect(), now)
+        elif self.pre_ping:
+            try:
+                conn._raw.ping(reconnect=False)
+            except mysql.connector.Error:
+                self._discard(conn._raw)
+                conn._replace_raw(self._connect(), now)
+        return conn
+
+    def acquire(self):
+        start = time.monotonic()
+        deadline = start + self.timeout
+        with self._cond:
+            stale = self._take_stale_locked(start)
+            while True:
+                if self._idle:
+                    conn = self._idle.pop()
+                    break
+                if self._open < self.size + self.max_overflow:
+                    self._open += 1
+                    conn = None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeoutError(
+                        f"Tempo esgotado aguardando conexão do pool ({self.timeout}s)."
+                    )
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+            self._checked_out += 1
+            waited = time.monotonic() - start
+            self._acquisitions += 1
+            self._wait_time_total += waited
+            self._wait_time_max = max(self._wait_time_max, waited)
+
+        for old in stale:
+            self._discard(old._raw)
+
+        try:
+            conn = self._prepare(conn)
+        except Exception:
+            with self._cond:
+                self._checked_out -= 1
+                self._open -= 1
+                self._cond.notify()
+            raise
+        conn._checked_out = True
+        return conn
+
+    def release(self, conn):
+        if not conn._checked_out:
+            return
+        conn._checked_out = False
+        healthy = True
+        try:
+            # Ends the implicit transaction so the next borrower gets a fresh snapshot.
+            conn._raw.rollback()
+        except mysql.connector.Error:
+            healthy = False
+
+        now = time.monotonic()
+        conn.last_used = now
+        keep = healthy and not self._is_expired(conn, now)
+        with self._cond:
+            self._checked_out -= 1
+            if keep and len(self._idle) < self.size:
+                self._idle.append(conn)
+            else:
+                self._open -= 1
+                keep = False
+            self._cond.notify()
+        if not keep:
+            self._discard(conn._raw)
+
+    def invalidate(self, conn):
+        if not conn._checked_out:
+            return
+        conn._checked_out = False
+        with self._cond:
+            self._checked_out -= 1
+            self._open -= 1
+            self._cond.notify()
+        # rollback() and close() would both read every unread row of an unbuffered result first;
+        # killing the session server-side makes them fail fast instead.
+        try:
+            thread_id = conn._raw.connection_id
+            killer = self._connect()
+            try:
+                killer.cmd_query(f"KILL {int(thread_id)}")
+            finally:
+                killer.close()
+        except mysql.connector.Error:
+            pass
+        self._discard(conn._raw)
+
+    def stats(self):
+        with self._cond:
+            return {
+                'size': self.size,
+                'max_overflow': self.max_overflow,
+                'open': self._open,
+                'idle': len(self._idle),
+                'checked_out': self._checked_out,
+                'waiting': self._waiting,
+                'acquisitions': self._acquisitions,
+                'timeouts': self._timeouts,
+                'wait_time_total': round(self._wait_time_total, 6),
+                'wait_time_max': round(self._wait_time_max, 6),
+                'wait_time_avg': round(self._wait_time_total / self._acquisitions, 6) if self._acquisitions else 0.0,
+            }
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool, _pool_pid
+    pid = os.getpid()
+    if _pool is None or _pool_pid != pid:
+        with _pool_lock:
+            if _pool is None or _pool_pid != pid:
+                # Sockets inherited from a parent process (gunicorn fork) must not be shared.
+                _pool = ConnectionPool(
+                    size=Config.DB_POOL_SIZE,
+                    max_overflow=Config.DB_POOL_MAX_OVERFLOW,
+                    timeout=Config.DB_POOL_TIMEOUT,
+                    idle_timeout=Config.DB_POOL_IDLE_TIMEOUT,
+                    recycle=Config.DB_POOL_RECYCLE,
+                    pre_ping=Config.DB_POOL_PRE_PING,
+                    host=Config.MYSQL_HOST,
+                    user=Config.MYSQL_USER,
+                    password=Config.MYSQL_PASSWORD,
+                    database=Config.MYSQL_DB
+                )
+                _pool_pid = pid
+    return _pool
+
+
+def get_pool_stats():
+    return get_pool().stats()
+
 
 def get_db_connection():
-    try:
-        conn = mysql.connector.connect(
-            host=Config.MYSQL_HOST,
-            user=Config.MYSQL_USER,
-            password=Config.MYSQL_PASSWORD,
-            database=Config.MYSQL_DB
-        )
+    if has_app_context():
+        conn = g.get('_db_conn')
+        if conn is None:
+            conn = g._db_conn = get_pool().acquire()
         return conn
-    except mysql.connector.Error as err:
-        print(f"Erro ao conectar ao MySQL: {err}")
-        raise
+    return get_pool().acquire()
+
 
 def close_db_connection(conn):
-    if conn and conn.is_connected():
-        conn.close()
\ No newline at end of file
+    if conn is None:
+        return
+    if has_app_context() and g.get('_db_conn') is conn:
+        # The request's connection is shared by every helper that runs during the request;
+        # it goes back to the pool at teardown.
+        return
+    conn.close()
+
+
+def _release_request_connection(exc=None):
+    conn = g.pop('_db_conn', None)
+    if conn is not None:
+        conn.close()
+
+
+def init_app(app):
+    app.teardown_appcontext(_release_request_connection)
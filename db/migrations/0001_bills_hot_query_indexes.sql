@@ -0,0 +1,16 @@
+-- =================================================================================================
+-- Indexes for the hot bill queries. Built online (INPLACE, no table lock) so it can run on a live
+-- database; MySQL refuses the statement instead of silently locking if that is not possible.
+-- =================================================================================================
+
+-- GET /api/bills: filters on user_id and a transaction_date range, keyset pagination on
+-- (transaction_date, id). The primary key is implicitly appended to every InnoDB secondary index.
+ALTER TABLE `bills`
+  ADD INDEX `idx_bills_user_date` (`user_id`, `transaction_date`),
+  ALGORITHM = INPLACE, LOCK = NONE;
+
+-- sp_recalculate_user_history and sp_execute_monthly_closing: SUM(amount) per category and month.
+-- Covering, so the aggregation never touches the clustered index.
+ALTER TABLE `bills`
+  ADD INDEX `idx_bills_category_date_amount` (`category_id`, `transaction_date`, `amount`),
+  ALGORITHM = INPLACE, LOCK = NONE;
@@ -0,0 +1,45 @@
+-- =================================================================================================
+-- Bill writes now keep monthly_budget_history current per category (utils/budget_history.py), so
+-- the row for the month being closed usually exists already. The closing overwrites it instead of
+-- failing the whole INSERT ... SELECT on the unique (category_id, period) key.
+-- =================================================================================================
+
+DROP PROCEDURE IF EXISTS `sp_execute_monthly_closing`;
+
+DELIMITER $$
+CREATE PROCEDURE `sp_execute_monthly_closing`()
+BEGIN
+    DECLARE v_previous_month DATE;
+    SET v_previous_month = DATE_FORMAT(CURDATE() - INTERVAL 1 MONTH, '%Y-%m-01');
+
+    INSERT INTO monthly_budget_history (category_id, period, base_budget, monthly_spend, starting_balance, ending_balance)
+    SELECT
+        spendings.category_id,
+        v_previous_month,
+        spendings.budget_amount,
+        spendings.total_spend,
+        IFNULL(previous_history.ending_balance, 0) AS starting_balance,
+        (IFNULL(previous_history.ending_balance, 0) + spendings.budget_amount) - spendings.total_spend AS ending_balance
+    FROM
+        (SELECT
+            c.id AS category_id,
+            IFNULL(c.budget_amount, 0) as budget_amount, -- Handles NULL budget_amount
+            SUM(b.amount) AS total_spend
+        FROM bills b
+        JOIN categories c ON b.category_id = c.id
+        JOIN users u ON c.user_id = u.id
+        WHERE u.cumulative_budget = 1
+          AND b.transaction_date >= v_previous_month
+          AND b.transaction_date < (v_previous_month + INTERVAL 1 MONTH)
+        GROUP BY c.id, c.budget_amount
+        ) AS spendings
+    LEFT JOIN
+        monthly_budget_history previous_history ON spendings.category_id = previous_history.category_id
+                                                  AND previous_history.period = (v_previous_month - INTERVAL 1 MONTH)
+    ON DUPLICATE KEY UPDATE
+        base_budget = VALUES(base_budget),
+        monthly_spend = VALUES(monthly_spend),
+        starting_balance = VALUES(starting_balance),
+        ending_balance = VALUES(ending_balance);
+END$$
+DELIMITER ;
@@ -0,0 +1,22 @@
+-- =================================================================================================
+-- The monthly closing moves from the MySQL event to closing.py, which processes users in batches
+-- and records its progress here so an interrupted run resumes where it stopped.
+-- =================================================================================================
+
+CREATE TABLE IF NOT EXISTS `monthly_closing_runs` (
+  `period` DATE NOT NULL,
+  `status` ENUM('running', 'done') NOT NULL DEFAULT 'running',
+  `last_user_id` INT NOT NULL DEFAULT 0,
+  `users_processed` INT NOT NULL DEFAULT 0,
+  `started_at` TIMESTAMP NULL DEFAULT CURRENT_TIMESTAMP,
+  `finished_at` TIMESTAMP NULL DEFAULT NULL,
+  PRIMARY KEY (`period`)
+) ENGINE = InnoDB;
+
+-- Run from a scheduler instead, e.g. cron: 0 3 1 * * python closing.py
+DROP EVENT IF EXISTS `evt_monthly_budget_closing`;
+
+-- Batches pick cumulative-budget users in id order.
+ALTER TABLE `users`
+  ADD INDEX `idx_users_cumulative_id` (`cumulative_budget`, `id`),
+  ALGORITHM = INPLACE, LOCK = NONE;
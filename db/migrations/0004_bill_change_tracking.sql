@@ -0,0 +1,29 @@
+-- =================================================================================================
+-- Change tracking for GET /api/bills/changes. Every bill write takes the next value of the user's
+-- bills_change_seq (the row lock orders concurrent writes, so sequence order is commit order) and
+-- stamps it on the rows it touches; deletes leave a tombstone carrying the sequence instead.
+-- =================================================================================================
+
+ALTER TABLE `users`
+  ADD COLUMN `bills_change_seq` BIGINT NOT NULL DEFAULT 0,
+  ALGORITHM = INSTANT;
+
+-- Existing rows keep 0 and are delivered by the first (cursor-less) sync.
+ALTER TABLE `bills`
+  ADD COLUMN `change_seq` BIGINT NOT NULL DEFAULT 0,
+  ALGORITHM = INSTANT;
+
+-- Keyset lookup on (user_id, change_seq, id); id comes from the implicit primary key suffix.
+ALTER TABLE `bills`
+  ADD INDEX `idx_bills_user_change` (`user_id`, `change_seq`),
+  ALGORITHM = INPLACE, LOCK = NONE;
+
+CREATE TABLE IF NOT EXISTS `bill_tombstones` (
+  `bill_id` INT NOT NULL,
+  `user_id` INT NOT NULL,
+  `change_seq` BIGINT NOT NULL,
+  `deleted_at` TIMESTAMP NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (`bill_id`),
+  INDEX `idx_tombstones_user_change` (`user_id`, `change_seq`),
+  CONSTRAINT `fk_tombstones_users` FOREIGN KEY (`user_id`) REFERENCES `users` (`id`) ON DELETE CASCADE ON UPDATE NO ACTION
+) ENGINE = InnoDB;
@@ -0,0 +1,29 @@
+-- =================================================================================================
+-- Ledger of CSV imports (import_data.py and POST /api/bills/import). A file whose checksum is
+-- already recorded for the user is skipped whole; for any other file only rows whose fingerprint is
+-- not recorded yet become bills.
+-- =================================================================================================
+
+CREATE TABLE IF NOT EXISTS `import_files` (
+  `id` INT NOT NULL AUTO_INCREMENT,
+  `user_id` INT NOT NULL,
+  `checksum` CHAR(64) NOT NULL,
+  `file_name` VARCHAR(255) NULL DEFAULT NULL,
+  `rows_imported` INT NOT NULL DEFAULT 0,
+  `rows_duplicated` INT NOT NULL DEFAULT 0,
+  `rows_rejected` INT NOT NULL DEFAULT 0,
+  `imported_at` TIMESTAMP NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (`id`),
+  UNIQUE INDEX `user_checksum_UNIQUE` (`user_id`, `checksum`),
+  CONSTRAINT `fk_import_files_users` FOREIGN KEY (`user_id`) REFERENCES `users` (`id`) ON DELETE CASCADE ON UPDATE NO ACTION
+) ENGINE = InnoDB;
+
+-- fingerprint: first 16 bytes of sha256 over date, description, amount, category and the row's
+-- repetition number in the file (identical lines in one statement are distinct bills).
+CREATE TABLE IF NOT EXISTS `import_row_fingerprints` (
+  `user_id` INT NOT NULL,
+  `fingerprint` BINARY(16) NOT NULL,
+  `import_file_id` INT NOT NULL,
+  PRIMARY KEY (`user_id`, `fingerprint`),
+  CONSTRAINT `fk_import_rows_files` FOREIGN KEY (`import_file_id`) REFERENCES `import_files` (`id`) ON DELETE CASCADE ON UPDATE NO ACTION
+) ENGINE = InnoDB;
@@ -0,0 +1,11 @@
+import gc
+from config import Config
+
+
+def on_starting(server):
+    # Loaded once in the master so forked workers share the model's pages copy-on-write.
+    if Config.NLP_MODE == 'spacy' and Config.SPACY_PREWARM:
+        from audio_process.spacy_extractor import carregar_modelo
+        carregar_modelo()
+        # Keeps the collector from touching (and so copying) the model's objects in every worker.
+        gc.freeze()
@@ -1,10 +1,16 @@
 import pandas as pd
 import mysql.connector
+import argparse
+import hashlib
 import os
 import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
-from decimal import Decimal, InvalidOperation
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
 from config import Config
+from utils.bill_changes import next_change_seq
+from utils.budget_history import refresh_budget_history
 
 DB_CONFIG = {
     "host": Config.MYSQL_HOST,
@@ -14,7 +20,20 @@ DB_CONFIG = {
 }
 
 CSV_FOLDER = 'csv_files'
-FILENAME_DATE_REGEX = r'(\d{2})-(\d{4})\.csv$'
+FILENAME_DATE_REGEX = r'(\d{2})[-_](\d{4})\.csv$'
+CSV_COLUMNS = ['description', 'amount_str', 'category_name']
+DEFAULT_DESCRIPTION = "Sem descrição"
+DEFAULT_CATEGORY = "OUTROS"
+CENT = Decimal('0.01')
+
+INSERT_BILL = """INSERT INTO bills (user_id, category_id, description, amount, transaction_date, change_seq)
+                 VALUES (%s, %s, %s, %s, %s, %s)"""
+
+FIND_IMPORT_FILE = "SELECT id FROM import_files WHERE user_id = %s AND checksum = %s"
+INSERT_IMPORT_FILE = "INSERT INTO import_files (user_id, checksum, file_name) VALUES (%s, %s, %s)"
+FINISH_IMPORT_FILE = """UPDATE import_files SET rows_imported = %s, rows_duplicated = %s, rows_rejected = %s
+                        WHERE id = %s"""
+INSERT_FINGERPRINT = "INSERT INTO import_row_fingerprints (user_id, fingerprint, import_file_id) VALUES (%s, %s, %s)"
 
 MONTH_NAMES = {
     'jan': 1, 'fev': 2, 'mar': 3, 'abr': 4, 'mai': 5, 'jun': 6,
@@ -53,77 +72,300 @@ def ensure_category_exists(cursor, user_id, category_name, budget_amount=None):
         )
         return cursor.lastrowid
 
-def clean_amount(amount_str):
-    if pd.isna(amount_str):
-        return Decimal(0)
-    
-    amount_str = str(amount_str).replace('R$', '').replace('.', '').replace(',', '.').replace(' ', '').strip()
+class CategoryResolver:
+    """Resolve nomes de categoria para IDs de um usuário, com cache em memória."""
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.cache = {}
+
+    def _select(self, cursor, names):
+        placeholders = ', '.join(['%s'] * len(names))
+        cursor.execute(
+            f"SELECT id, name FROM categories WHERE user_id = %s AND name IN ({placeholders})",
+            (self.user_id, *names)
+        )
+        for category_id, name in cursor.fetchall():
+            self.cache[name.upper()] = category_id
+
+    def resolve(self, cursor, names):
+        missing = sorted({name for name in names if name not in self.cache})
+        if missing:
+            self._select(cursor, missing)
+            new = [name for name in missing if name not in self.cache]
+            if new:
+                # INSERT IGNORE: another worker may be creating the same category right now.
+                cursor.executemany(
+                    "INSERT IGNORE INTO categories (user_id, name) VALUES (%s, %s)",
+                    [(self.user_id, name) for name in new]
+                )
+                self._select(cursor, new)
+            for name in new:
+                if name not in self.cache:
+                    # The collation matched an existing name spelled differently (e.g. accents).
+                    self.cache[name] = ensure_category_exists(cursor, self.user_id, name)
+        return {name: self.cache[name] for name in names}
+
+def parse_amount(value):
+    """Valor já limpo -> Decimal com duas casas, como na coluna DECIMAL(10,2); None se não for um número."""
     try:
-        return Decimal(amount_str)
+        amount = Decimal(value)
+        return amount.quantize(CENT, ROUND_HALF_UP) if amount.is_finite() else None
     except InvalidOperation:
-        print(f"Aviso: Não foi possível converter o valor '{amount_str}' para Decimal. Usando 0.")
-        return Decimal(0)
+        return None
 
-def import_csv_to_db():
-    conn = None
+def parse_amounts(amounts):
+    """Limpa "R$ 1.234,56" e converte para Decimal; valores que não puderam ser convertidos ficam nulos."""
+    cleaned = (
+        amounts.astype('string')
+        .str.replace('R$', '', regex=False)
+        .str.replace('.', '', regex=False)
+        .str.replace(',', '.', regex=False)
+        .str.replace(' ', '', regex=False)
+        .str.strip()
+    )
+    # Decimal straight from the text: a float64 round trip could change the cents stored.
+    return cleaned.map(parse_amount, na_action='ignore').astype(object)
 
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
+def clean_descriptions(descriptions):
+    descriptions = descriptions.fillna('').astype(str).str.strip()
+    return descriptions.mask(descriptions == '', DEFAULT_DESCRIPTION)
 
-        user_id = 1
+def clean_categories(categories):
+    categories = categories.fillna('').astype(str).str.strip().str.upper()
+    return categories.mask(categories == '', DEFAULT_CATEGORY)
 
-        csv_files = [f for f in os.listdir(CSV_FOLDER) if f.endswith('.csv')]
-        if not csv_files:
-            print(f"Nenhum arquivo CSV encontrado na pasta: {CSV_FOLDER}")
-            return
+def prepare_bills(user_id, transaction_date, descriptions, amounts, categories, resolver, cursor):
+    category_ids = categories.map(resolver.resolve(cursor, categories.unique().tolist()))
+    return list(zip(
+        [user_id] * len(descriptions),
+        category_ids.tolist(),
+        descriptions.tolist(),
+        amounts.tolist(),
+        [transaction_date] * len(descriptions)
+    ))
 
-        for csv_file in csv_files:
-            file_path = os.path.join(CSV_FOLDER, csv_file)
-            print(f"\nProcessando arquivo: {csv_file}")
+def file_checksum(source, block_size=1 << 20):
+    """sha256 de um arquivo aberto em modo binário; volta ao início para a leitura do CSV."""
+    digest = hashlib.sha256()
+    for block in iter(lambda: source.read(block_size), b''):
+        digest.update(block)
+    source.seek(0)
+    return digest.hexdigest()
 
-            match = re.search(r'(\d{2})[-_](\d{4})\.csv$', csv_file)
-            if not match:
-                print(f"Ignorando '{csv_file}': Nome do arquivo não corresponde ao padrão de data (ex: '07-2025.csv').")
-                continue
+def row_fingerprints(transaction_date, descriptions, amounts, categories, seen):
+    """Impressão digital de cada linha já limpa: data, descrição, valor, categoria e repetição.
 
-            month, year = int(match.group(1)), int(match.group(2))
-            transaction_date = datetime(year, month, 1).date()
+    seen conta, por arquivo, quantas vezes cada linha já apareceu: dois cafés iguais no mesmo mês
+    são duas contas, e só um terceiro café num extrato atualizado é novo.
+    """
+    fingerprints = []
+    day = transaction_date.isoformat()
+    for description, amount, category in zip(descriptions, amounts, categories):
+        row = hashlib.sha256(f"{day}\x1f{description}\x1f{amount:.2f}\x1f{category}".encode('utf-8')).digest()
+        seen[row] = occurrence = seen.get(row, 0) + 1
+        fingerprints.append(hashlib.sha256(row + occurrence.to_bytes(4, 'big')).digest()[:16])
+    return fingerprints
 
-            try:
-                df = pd.read_csv(file_path, skiprows=1, header=None, names=['description', 'amount_str', 'category_name'])
-            except Exception as e:
-                print(f"Erro ao ler CSV '{csv_file}': {e}")
-                continue
+def known_fingerprints(cursor, user_id, fingerprints):
+    if not fingerprints:
+        return set()
+    placeholders = ', '.join(['%s'] * len(fingerprints))
+    cursor.execute(
+        f"SELECT fingerprint FROM import_row_fingerprints WHERE user_id = %s AND fingerprint IN ({placeholders})",
+        (user_id, *fingerprints)
+    )
+    return {bytes(fingerprint) for fingerprint, in cursor.fetchall()}
 
-            for row, _ in df.iterrows():
-                description = str(row[0]) if row[0] else "Sem descrição"
-                amount = clean_amount(row[1])
-                category_id = ensure_category_exists(cursor, 1, row[2]) if row[2] else 1
+def parse_csv(source, transaction_date, chunk_size, malformed):
+    """Lê e limpa o CSV bloco a bloco, sem acessar o banco.
 
-                cursor.execute(
-                    """INSERT INTO bills (user_id, category_id, description, amount, transaction_date)
-                    VALUES (%s, %s, %s, %s, %s)""", (user_id, category_id, description, amount, transaction_date)
-                )
+    Gera (descrições, valores, categorias, impressões digitais, valores inválidos) por bloco; as
+    linhas malformadas vão para malformed.
+    """
+    def reject(line):
+        malformed.append(line)
+        return None
 
-            conn.commit()
-            print(f"Importação de '{csv_file}' concluída. {len(df)} transações inseridas.")
+    seen = {}
+    # The python engine is the one that hands every malformed line to a callable. The C engine, read
+    # in chunks, silently truncates an over-long line at the start of a chunk instead of rejecting it.
+    chunks = pd.read_csv(source, skiprows=1, header=None, names=CSV_COLUMNS, dtype=str,
+                         chunksize=chunk_size, engine='python', on_bad_lines=reject)
+    for df in chunks:
+        amounts = parse_amounts(df['amount_str'])
+        invalid = amounts.isna() & df['amount_str'].notna()
+        df, amounts = df[~invalid], amounts[~invalid]
+        amounts = amounts.where(amounts.notna(), Decimal(0))
+        descriptions = clean_descriptions(df['description'])
+        categories = clean_categories(df['category_name'])
+        fingerprints = row_fingerprints(transaction_date, descriptions, amounts, categories, seen)
+        yield descriptions, amounts, categories, fingerprints, int(invalid.sum())
+
+def import_parsed_chunks(cursor, chunks, malformed, checksum, user_id, transaction_date, file_name=None, dry_run=False):
+    """Grava, na transação do cursor, os blocos de parse_csv de um arquivo com este checksum.
+
+    Um arquivo com checksum já registrado para o usuário é ignorado; nos demais só entram as linhas
+    cuja impressão digital ainda não está no registro. dry_run só conta: não cria categorias, contas
+    nem registros. Retorna um dict com skipped, imported, duplicates, rejected e category_ids.
+    """
+    result = {'skipped': False, 'imported': 0, 'duplicates': 0, 'rejected': 0, 'category_ids': set()}
+    change_seq = None
+    if not dry_run:
+        # The user's row is locked (X) before any insert whose foreign key would take a shared lock
+        # on it: S then X on the same row deadlocks against any concurrent write by this user. Taken
+        # before the first read, too, so the snapshot already holds what an import of another file
+        # by this user committed while this one waited for the lock.
+        change_seq = next_change_seq(cursor, user_id)
+    cursor.execute(FIND_IMPORT_FILE, (user_id, checksum))
+    if cursor.fetchall():
+        result['skipped'] = True
+        return result
+
+    import_file_id = None
+    if not dry_run:
+        cursor.execute(INSERT_IMPORT_FILE, (user_id, checksum, file_name))
+        import_file_id = cursor.lastrowid
 
-    except mysql.connector.Error as err:
-        print(f"Erro no MySQL: {err}")
-        if conn:
+    resolver = CategoryResolver(user_id)
+    for descriptions, amounts, categories, fingerprints, invalid in chunks:
+        result['rejected'] += invalid
+        known = known_fingerprints(cursor, user_id, fingerprints)
+        new = pd.Series([fingerprint not in known for fingerprint in fingerprints], index=descriptions.index, dtype=bool)
+        result['duplicates'] += len(fingerprints) - int(new.sum())
+        if dry_run:
+            result['imported'] += int(new.sum())
+            continue
+        if not new.any():
+            continue
+
+        rows = prepare_bills(user_id, transaction_date, descriptions[new], amounts[new], categories[new], resolver, cursor)
+        cursor.executemany(INSERT_BILL, [row + (change_seq,) for row in rows])
+        cursor.executemany(INSERT_FINGERPRINT, [
+            (user_id, fingerprint, import_file_id)
+            for fingerprint, is_new in zip(fingerprints, new) if is_new
+        ])
+        result['imported'] += len(rows)
+        result['category_ids'].update(row[1] for row in rows)
+
+    result['rejected'] += len(malformed)
+    if not dry_run:
+        cursor.execute(FINISH_IMPORT_FILE, (result['imported'], result['duplicates'], result['rejected'], import_file_id))
+    return result
+
+def import_csv_stream(cursor, source, user_id, transaction_date, chunk_size=Config.IMPORT_CHUNK_SIZE,
+                      file_name=None, dry_run=False):
+    """Importa um CSV aberto em modo binário (arquivo ou upload) bloco a bloco, na transação do cursor.
+
+    Só o bloco atual fica em memória; a leitura acontece dentro da transação, com a linha do usuário
+    travada. Linhas malformadas e valores que não puderam ser convertidos são rejeitados.
+    Retorna o resumo de import_parsed_chunks.
+    """
+    checksum = file_checksum(source)
+    malformed = []
+    chunks = parse_csv(source, transaction_date, chunk_size, malformed)
+    return import_parsed_chunks(cursor, chunks, malformed, checksum, user_id, transaction_date, file_name, dry_run)
+
+def transaction_date_from_filename(filename):
+    match = re.search(FILENAME_DATE_REGEX, filename)
+    if not match:
+        return None
+    month, year = int(match.group(1)), int(match.group(2))
+    return datetime(year, month, 1).date()
+
+def import_csv_file(file_path, user_id, chunk_size=Config.IMPORT_CHUNK_SIZE, dry_run=False):
+    """Importa um arquivo CSV em uma única transação e retorna (resumo de import_parsed_chunks, segundos).
+
+    O arquivo é lido e limpo inteiro antes da transação: os arquivos de um mesmo usuário são lidos
+    em paralelo e só as gravações esperam pela linha do usuário, uma após a outra.
+    """
+    start = time.perf_counter()
+    file_name = os.path.basename(file_path)
+    transaction_date = transaction_date_from_filename(file_name)
+
+    malformed = []
+    with open(file_path, 'rb') as source:
+        checksum = file_checksum(source)
+        chunks = list(parse_csv(source, transaction_date, chunk_size, malformed))
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        result = import_parsed_chunks(cursor, chunks, malformed, checksum, user_id, transaction_date, file_name, dry_run)
+        if dry_run:
             conn.rollback()
-    except Exception as e:
-        print(f"Ocorreu um erro: {e}")
+        else:
+            # Same as the HTTP import: a cumulative user's history is redone from this month on.
+            refresh_budget_history(cursor, user_id, [(category_id, transaction_date) for category_id in result['category_ids']])
+            conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
     finally:
-        if conn and conn.is_connected():
-            cursor.close()
-            conn.close()
-            print("Conexão com o banco de dados fechada.")
+        cursor.close()
+        conn.close()
+    return result, time.perf_counter() - start
+
+def describe_import(result, dry_run):
+    if result['skipped']:
+        return "sem alterações desde a última importação, ignorado"
+    verb = "seriam inseridas" if dry_run else "inseridas"
+    return (f"{result['imported']} transações {verb}, {result['duplicates']} já importadas, "
+            f"{result['rejected']} rejeitadas")
+
+def import_csv_to_db(user_id=1, workers=Config.IMPORT_WORKERS, chunk_size=Config.IMPORT_CHUNK_SIZE, dry_run=False):
+    csv_files = sorted(f for f in os.listdir(CSV_FOLDER) if f.endswith('.csv'))
+    if not csv_files:
+        print(f"Nenhum arquivo CSV encontrado na pasta: {CSV_FOLDER}")
+        return
+
+    file_paths = []
+    for csv_file in csv_files:
+        if not transaction_date_from_filename(csv_file):
+            print(f"Ignorando '{csv_file}': Nome do arquivo não corresponde ao padrão de data (ex: '07-2025.csv').")
+            continue
+        file_paths.append(os.path.join(CSV_FOLDER, csv_file))
+
+    start = time.perf_counter()
+    total_rows = 0
+    skipped = 0
+    with ProcessPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {
+            executor.submit(import_csv_file, file_path, user_id, chunk_size, dry_run): file_path
+            for file_path in file_paths
+        }
+        for future in as_completed(futures):
+            csv_file = os.path.basename(futures[future])
+            try:
+                result, elapsed = future.result()
+            except mysql.connector.Error as err:
+                print(f"Erro no MySQL ao importar '{csv_file}': {err}")
+                continue
+            except Exception as e:
+                print(f"Erro ao importar '{csv_file}': {e}")
+                continue
+            rows = result['imported']
+            total_rows += rows
+            skipped += result['skipped']
+            rate = rows / elapsed if elapsed else 0
+            print(f"'{csv_file}': {describe_import(result, dry_run)} em {elapsed:.2f}s ({rate:.0f} linhas/s).")
+
+    elapsed = time.perf_counter() - start
+    rate = total_rows / elapsed if elapsed else 0
+    prefix = "Simulação (--dry-run), nada foi gravado. " if dry_run else ""
+    print(f"\n{prefix}Total: {total_rows} transações novas de {len(file_paths)} arquivo(s), "
+          f"{skipped} sem alterações, em {elapsed:.2f}s ({rate:.0f} linhas/s).")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Importa extratos CSV da pasta csv_files.")
+    parser.add_argument('--user-id', type=int, default=1)
+    parser.add_argument('--workers', type=int, default=Config.IMPORT_WORKERS, help="Arquivos processados em paralelo.")
+    parser.add_argument('--chunk-size', type=int, default=Config.IMPORT_CHUNK_SIZE, help="Linhas por executemany.")
+    parser.add_argument('--dry-run', action='store_true', help="Só informa o que seria importado, sem gravar.")
+    args = parser.parse_args()
+
     if not os.path.exists(CSV_FOLDER):
         os.makedirs(CSV_FOLDER)
         print(f"Pasta '{CSV_FOLDER}' criada. Coloque seus arquivos CSV aqui.")
     else:
-        import_csv_to_db()
\ No newline at end of file
+        import_csv_to_db(args.user_id, args.workers, args.chunk_size, args.dry_run)
@@ -0,0 +1,339 @@
+import argparse
+import ast
+import hashlib
+import os
+import re
+import sys
+import time
+import mysql.connector
+from config import Config
+from db import get_db_connection, close_db_connection
+
+MIGRATIONS_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'db', 'migrations')
+MIGRATION_FILENAME_REGEX = re.compile(r'^(\d{4})_(\w+)\.sql$')
+EXPLAIN_SOURCES = ['routes', 'repository.py', 'utils']
+# The job queue's SQL runs on SQLite, not MySQL.
+EXPLAIN_EXCLUDE = {os.path.join('utils', 'job_queue.py')}
+SQL_STATEMENT_REGEX = re.compile(r'^\s*\(?\s*(SELECT|INSERT|UPDATE|DELETE|REPLACE)\b', re.IGNORECASE)
+
+# A literal that MySQL can coerce into INT, DECIMAL, DATE and VARCHAR columns alike, so the
+# optimizer still considers the index for every placeholder it replaces.
+EXPLAIN_SAMPLE_VALUE = "'2000-01-01'"
+
+CREATE_MIGRATIONS_TABLE = """
+CREATE TABLE IF NOT EXISTS `schema_migrations` (
+  `version` int NOT NULL,
+  `name` varchar(255) NOT NULL,
+  `checksum` char(64) NOT NULL,
+  `execution_ms` int NOT NULL,
+  `applied_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (`version`)
+) ENGINE = InnoDB CHARACTER SET = utf8mb4 COLLATE = utf8mb4_unicode_ci"""
+
+
+class MigrationError(Exception):
+    pass
+
+
+def load_migrations():
+    migrations = []
+    for filename in sorted(os.listdir(MIGRATIONS_FOLDER)):
+        match = MIGRATION_FILENAME_REGEX.match(filename)
+        if not match:
+            continue
+        with open(os.path.join(MIGRATIONS_FOLDER, filename), 'rb') as f:
+            content = f.read()
+        migrations.append({
+            'version': int(match.group(1)),
+            'name': match.group(2),
+            'checksum': hashlib.sha256(content).hexdigest(),
+            'sql': content.decode('utf-8'),
+        })
+    versions = [m['version'] for m in migrations]
+    if len(versions) != len(set(versions)):
+        raise MigrationError('Existem migrações com a mesma versão.')
+    return migrations
+
+
+def split_statements(sql):
+    """Quebra o script em comandos, respeitando DELIMITER como o cliente mysql."""
+    statements = []
+    delimiter = ';'
+    buffer = []
+    for line in sql.splitlines():
+        stripped = line.strip()
+        if not buffer and (not stripped or stripped.startswith('--')):
+            continue
+        if stripped.upper().startswith('DELIMITER '):
+            delimiter = stripped.split(None, 1)[1]
+            continue
+        if stripped.endswith(delimiter):
+            buffer.append(line.rstrip()[:-len(delimiter)])
+            statement = '\n'.join(buffer).strip()
+            if statement:
+                statements.append(statement)
+            buffer = []
+        else:
+            buffer.append(line)
+    if '\n'.join(buffer).strip():
+        statements.append('\n'.join(buffer).strip())
+    return statements
+
+
+def get_applied(cursor):
+    cursor.execute(CREATE_MIGRATIONS_TABLE)
+    cursor.execute("SELECT version, name, checksum FROM schema_migrations ORDER BY version")
+    return {version: (name, checksum) for version, name, checksum in cursor.fetchall()}
+
+
+def verify_applied(migrations, applied):
+    known = {m['version']: m for m in migrations}
+    for version, (name, checksum) in applied.items():
+        migration = known.get(version)
+        if migration is None:
+            raise MigrationError(f"Migração {version:04d}_{name} foi aplicada mas não existe mais no repositório.")
+        if migration['checksum'] != checksum:
+            raise MigrationError(
+                f"Migração {version:04d}_{name} foi alterada depois de aplicada. "
+                "Migrações são somente de avanço: crie uma nova migração."
+            )
+
+
+def apply_migrations():
+    migrations = load_migrations()
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT GET_LOCK('schema_migrations', 10)")
+        if cursor.fetchone()[0] != 1:
+            raise MigrationError('Outra execução de migrações está em andamento.')
+        try:
+            # Keeps a migration waiting on a metadata lock from stalling the application's queries.
+            cursor.execute("SET SESSION lock_wait_timeout = %s", (Config.MIGRATION_LOCK_WAIT_TIMEOUT,))
+            applied = get_applied(cursor)
+            verify_applied(migrations, applied)
+
+            pending = [m for m in migrations if m['version'] not in applied]
+            if not pending:
+                print("Nenhuma migração pendente.")
+                return
+
+            for migration in pending:
+                label = f"{migration['version']:04d}_{migration['name']}"
+                print(f"Aplicando {label}...")
+                start = time.perf_counter()
+                for statement in split_statements(migration['sql']):
+                    cursor.execute(statement)
+                    if cursor.with_rows:
+                        cursor.fetchall()
+                elapsed_ms = int((time.perf_counter() - start) * 1000)
+                cursor.execute(
+                    "INSERT INTO schema_migrations (version, name, checksum, execution_ms) VALUES (%s, %s, %s, %s)",
+                    (migration['version'], migration['name'], migration['checksum'], elapsed_ms)
+                )
+                conn.commit()
+                print(f"{label} aplicada em {elapsed_ms} ms.")
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK('schema_migrations')")
+            cursor.fetchall()
+    finally:
+        close_db_connection(conn)
+
+
+def show_status():
+    migrations = load_migrations()
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        applied = get_applied(cursor)
+        conn.commit()
+    finally:
+        close_db_connection(conn)
+    for migration in migrations:
+        label = f"{migration['version']:04d}_{migration['name']}"
+        if migration['version'] not in applied:
+            state = 'pendente'
+        elif applied[migration['version']][1] != migration['checksum']:
+            state = 'ALTERADA'
+        else:
+            state = 'aplicada'
+        print(f"{label:60} {state}")
+
+
+def _module_constants(tree):
+    constants = {}
+    for node in tree.body:
+        if isinstance(node, ast.Assign):
+            # f-strings are resolved against the constants defined above them.
+            value = _render(node.value, constants)
+            if value is None:
+                continue
+            for target in node.targets:
+                if isinstance(target, ast.Name):
+                    constants[target.id] = value
+    return constants
+
+
+def _render(node, constants):
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return node.value
+    if isinstance(node, ast.Name):
+        return constants.get(node.id)
+    if isinstance(node, ast.JoinedStr):
+        parts = []
+        for value in node.values:
+            if isinstance(value, ast.Constant):
+                parts.append(value.value)
+            elif isinstance(value, ast.FormattedValue) and isinstance(value.value, ast.Name) \
+                    and value.value.id in constants:
+                parts.append(constants[value.value.id])
+            else:
+                return None
+        return ''.join(parts)
+    return None
+
+
+def _resolve_name(function, name, before_line, constants):
+    # Concatenates every "name = ..." / "name += ..." that precedes the call, so optional
+    # filters all end up in the explained query.
+    pieces = []
+    for node in ast.walk(function):
+        if getattr(node, 'lineno', before_line) >= before_line:
+            continue
+        if isinstance(node, ast.Assign) and any(isinstance(t, ast.Name) and t.id == name for t in node.targets):
+            pieces.append((node.lineno, 'set', node.value))
+        elif isinstance(node, ast.AugAssign) and isinstance(node.target, ast.Name) and node.target.id == name \
+                and isinstance(node.op, ast.Add):
+            pieces.append((node.lineno, 'add', node.value))
+    sql = None
+    for _, kind, value in sorted(pieces, key=lambda p: p[0]):
+        rendered = _render(value, constants)
+        if rendered is None:
+            return None
+        sql = rendered if kind == 'set' or sql is None else sql + rendered
+    if sql is None:
+        # Not assigned in the function: a module-level query constant.
+        return constants.get(name)
+    return sql
+
+
+def _imported_constants(tree, base):
+    """Constantes importadas de outros módulos do projeto (from utils.x import QUERY)."""
+    constants = {}
+    for node in tree.body:
+        if not isinstance(node, ast.ImportFrom) or not node.module or node.level:
+            continue
+        filename = os.path.join(base, *node.module.split('.')) + '.py'
+        if not os.path.exists(filename):
+            continue
+        with open(filename, encoding='utf-8') as f:
+            module_constants = _module_constants(ast.parse(f.read(), filename))
+        for alias in node.names:
+            if alias.name in module_constants:
+                constants[alias.asname or alias.name] = module_constants[alias.name]
+    return constants
+
+
+def _local_names(function):
+    names = {arg.arg for arg in function.args.args + function.args.kwonlyargs}
+    for node in ast.walk(function):
+        if isinstance(node, (ast.Assign, ast.AugAssign)):
+            targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+            names.update(t.id for t in targets if isinstance(t, ast.Name))
+    return names
+
+
+def collect_queries(paths=None):
+    base = os.path.dirname(os.path.abspath(__file__))
+    queries = []
+    for path in paths or EXPLAIN_SOURCES:
+        full = os.path.join(base, path)
+        files = [full] if full.endswith('.py') else [
+            os.path.join(full, f) for f in sorted(os.listdir(full)) if f.endswith('.py')
+        ]
+        for filename in files:
+            if os.path.relpath(filename, base) in EXPLAIN_EXCLUDE:
+                continue
+            with open(filename, encoding='utf-8') as f:
+                tree = ast.parse(f.read(), filename)
+            constants = {**_imported_constants(tree, base), **_module_constants(tree)}
+            seen = set()
+            for function in [n for n in ast.walk(tree) if isinstance(n, ast.FunctionDef)]:
+                local = _local_names(function)
+                for call in [n for n in ast.walk(function) if isinstance(n, ast.Call)]:
+                    if call.lineno in seen:
+                        continue
+                    origin = f"{os.path.relpath(filename, base)}:{call.lineno} ({function.name})"
+                    if isinstance(call.func, ast.Attribute) and call.func.attr in ('execute', 'executemany') \
+                            and call.args:
+                        arg = call.args[0]
+                        if isinstance(arg, ast.Name):
+                            if arg.id in {a.arg for a in function.args.args}:
+                                # A helper's parameter (repository._execute): checked at its call sites.
+                                continue
+                            sql = _resolve_name(function, arg.id, call.lineno, constants)
+                        else:
+                            sql = _render(arg, constants)
+                        seen.add(call.lineno)
+                        queries.append((origin, sql))
+                        continue
+                    # Module-level SQL constants handed to a helper, e.g. _execute(conn, INSERT_USER, ...).
+                    for arg in call.args:
+                        if isinstance(arg, ast.Name) and arg.id not in local and arg.id in constants \
+                                and SQL_STATEMENT_REGEX.match(constants[arg.id]):
+                            seen.add(call.lineno)
+                            queries.append((origin, constants[arg.id]))
+    return queries
+
+
+def explain_queries(paths=None):
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    failures = 0
+    try:
+        for origin, sql in collect_queries(paths):
+            if sql is None:
+                print(f"[IGNORADA] {origin}: SQL montado dinamicamente.")
+                continue
+            statement = ' '.join(sql.split()).rstrip(';')
+            if not SQL_STATEMENT_REGEX.match(statement):
+                print(f"[IGNORADA] {origin}: {statement[:60]}")
+                continue
+            statement = re.sub(r'LIMIT\s+%s', 'LIMIT 1', statement, flags=re.IGNORECASE)
+            statement = statement.replace('%s', EXPLAIN_SAMPLE_VALUE)
+            cursor.execute("EXPLAIN " + statement)
+            plan = cursor.fetchall()
+            scans = [row['table'] for row in plan if row.get('type') == 'ALL']
+            if scans:
+                failures += 1
+                print(f"[FULL SCAN] {origin}: {', '.join(scans)}\n    {statement}")
+            else:
+                keys = ', '.join(f"{row['table']}={row['key']}" for row in plan if row.get('table'))
+                print(f"[OK] {origin}: {keys}")
+    finally:
+        close_db_connection(conn)
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrações de esquema do bills_db.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('apply', help="Aplica as migrações pendentes, em ordem.")
+    subparsers.add_parser('status', help="Lista as migrações e seu estado.")
+    explain_parser = subparsers.add_parser('explain', help="Roda EXPLAIN nas queries das rotas e falha em full scans.")
+    explain_parser.add_argument('paths', nargs='*', help="Arquivos ou pastas a inspecionar (padrão: routes, repository.py e utils).")
+    args = parser.parse_args()
+
+    try:
+        if args.command == 'apply':
+            apply_migrations()
+        elif args.command == 'status':
+            show_status()
+        else:
+            failures = explain_queries(args.paths)
+            if failures:
+                print(f"{failures} consulta(s) com full table scan.")
+                sys.exit(1)
+    except (MigrationError, mysql.connector.Error) as err:
+        print(f"Erro: {err}")
+        sys.exit(1)
@@ -1,7 +1,48 @@
 from datetime import datetime
 from decimal import Decimal
 
-class User:
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+
+def _float(value):
+    return float(value) if value is not None else None
+
+
+class Model:
+    """Base dos modelos: __slots__ no lugar do __dict__ e construção direta a partir das linhas do cursor.
+
+    JSON_FIELDS lista os campos serializados, com a conversão para JSON de cada um (None = nenhuma).
+    """
+    __slots__ = ()
+    JSON_FIELDS = ()
+
+    @classmethod
+    def from_row(cls, row):
+        """row: tupla do cursor com as colunas na ordem de __slots__."""
+        return cls(*row)
+
+    def to_dict(self):
+        return {
+            name: getattr(self, name) if convert is None else convert(getattr(self, name))
+            for name, convert in self.JSON_FIELDS
+        }
+
+    @classmethod
+    def columns(cls, rows):
+        """Linhas do cursor -> {campo: [valores]}, convertendo coluna a coluna sem criar instâncias."""
+        values = dict(zip(cls.__slots__, zip(*rows))) if rows else {}
+        return {
+            name: list(values.get(name, ())) if convert is None else [convert(value) for value in values.get(name, ())]
+            for name, convert in cls.JSON_FIELDS
+        }
+
+
+class User(Model):
+    __slots__ = ('id', 'name', 'email', 'password_hash', 'created_at')
+    JSON_FIELDS = (('id', None), ('name', None), ('email', None), ('created_at', _iso))
+
     def __init__(self, id, name, email, password_hash, created_at):
         self.id = id
         self.name = name
@@ -9,15 +50,11 @@ class User:
         self.password_hash = password_hash
         self.created_at = created_at
 
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'name': self.name,
-            'email': self.email,
-            'created_at': self.created_at.isoformat() if self.created_at else None
-        }
 
-class Category:
+class Category(Model):
+    __slots__ = ('id', 'user_id', 'name', 'budget_amount', 'created_at')
+    JSON_FIELDS = (('id', None), ('user_id', None), ('name', None), ('budget_amount', _float), ('created_at', _iso))
+
     def __init__(self, id, user_id, name, budget_amount, created_at):
         self.id = id
         self.user_id = user_id
@@ -25,16 +62,14 @@ class Category:
         self.budget_amount = budget_amount
         self.created_at = created_at
 
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'user_id': self.user_id,
-            'name': self.name,
-            'budget_amount': float(self.budget_amount) if self.budget_amount is not None else None,
-            'created_at': self.created_at.isoformat() if self.created_at else None
-        }
 
-class Bill:
+class Bill(Model):
+    __slots__ = ('id', 'user_id', 'category_id', 'description', 'amount', 'transaction_date', 'created_at')
+    JSON_FIELDS = (
+        ('id', None), ('user_id', None), ('category_id', None), ('description', None),
+        ('amount', float), ('transaction_date', _iso), ('created_at', _iso)
+    )
+
     def __init__(self, id, user_id, category_id, description, amount, transaction_date, created_at):
         self.id = id
         self.user_id = user_id
@@ -43,14 +78,3 @@ class Bill:
         self.amount = amount
         self.transaction_date = transaction_date
         self.created_at = created_at
-
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'user_id': self.user_id,
-            'category_id': self.category_id,
-            'description': self.description,
-            'amount': float(self.amount),
-            'transaction_date': self.transaction_date.isoformat() if self.transaction_date else None,
-            'created_at': self.created_at.isoformat() if self.created_at else None
-        }
\ No newline at end of file
@@ -0,0 +1,117 @@
+"""Acesso a dados compartilhado pelas rotas: uma instrução por operação, com prepared statements.
+
+As verificações de posse ficam no WHERE da própria escrita (rowcount 0 = não encontrado ou não
+pertence ao usuário) e os registros criados são montados a partir dos parâmetros e do lastrowid.
+"""
+
+INSERT_USER = "INSERT INTO users (name, email, password_hash) VALUES (%s, %s, %s)"
+FIND_USER_BY_EMAIL = "SELECT id, password_hash, cumulative_budget FROM users WHERE email = %s"
+UPDATE_PASSWORD_HASH = "UPDATE users SET password_hash = %s WHERE id = %s"
+# The new value comes back in lastrowid through LAST_INSERT_ID(expr), so no SELECT is needed.
+TOGGLE_CUMULATIVE_BUDGET = "UPDATE users SET cumulative_budget = LAST_INSERT_ID(NOT cumulative_budget) WHERE id = %s"
+
+INSERT_CATEGORY = "INSERT INTO categories (user_id, name, budget_amount) VALUES (%s, %s, %s)"
+UPDATE_CATEGORY = """
+    UPDATE categories SET name = COALESCE(%s, name), budget_amount = COALESCE(%s, budget_amount)
+    WHERE id = %s AND user_id = %s"""
+DELETE_CATEGORY = "DELETE FROM categories WHERE id = %s AND user_id = %s"
+
+INSERT_BILL = """
+    INSERT INTO bills (user_id, category_id, description, amount, transaction_date, change_seq)
+    SELECT user_id, id, %s, %s, %s, %s FROM categories WHERE id = %s AND user_id = %s"""
+# Locks the bill and reads what the budget history needs (previous month and category, and whether
+# the user keeps a history at all) in one statement.
+LOCK_BILL = """
+    SELECT b.category_id, b.transaction_date, u.cumulative_budget
+    FROM bills b
+    JOIN users u ON u.id = b.user_id
+    WHERE b.id = %s AND b.user_id = %s
+    FOR UPDATE"""
+UPDATE_BILL = """
+    UPDATE bills
+    SET category_id = COALESCE(%s, category_id),
+        description = COALESCE(%s, description),
+        amount = COALESCE(%s, amount),
+        transaction_date = COALESCE(%s, transaction_date),
+        change_seq = %s
+    WHERE id = %s AND user_id = %s
+      AND (%s IS NULL OR EXISTS (SELECT 1 FROM categories WHERE id = %s AND user_id = %s))"""
+DELETE_BILL = "DELETE FROM bills WHERE id = %s AND user_id = %s"
+
+
+def _execute(conn, sql, params, dictionary=False):
+    cursor = conn.prepared(sql, dictionary)
+    cursor.execute(sql, params)
+    return cursor
+
+
+def _fetch_one(conn, sql, params):
+    # Prepared cursors are unbuffered: the result is always read to the end.
+    rows = _execute(conn, sql, params, dictionary=True).fetchall()
+    return rows[0] if rows else None
+
+
+def create_user(conn, name, email, password_hash):
+    """Levanta IntegrityError se o email já estiver cadastrado."""
+    return _execute(conn, INSERT_USER, (name, email, password_hash)).lastrowid
+
+
+def find_user_by_email(conn, email):
+    return _fetch_one(conn, FIND_USER_BY_EMAIL, (email,))
+
+
+def update_password_hash(conn, user_id, password_hash):
+    _execute(conn, UPDATE_PASSWORD_HASH, (password_hash, user_id))
+
+
+def toggle_cumulative_budget(conn, user_id):
+    """Retorna o novo valor de cumulative_budget, ou None se o usuário não existir."""
+    cursor = _execute(conn, TOGGLE_CUMULATIVE_BUDGET, (user_id,))
+    if cursor.rowcount == 0:
+        return None
+    return bool(cursor.lastrowid)
+
+
+def create_category(conn, user_id, name, budget_amount):
+    """Levanta IntegrityError se o usuário já tiver uma categoria com esse nome."""
+    cursor = _execute(conn, INSERT_CATEGORY, (user_id, name, budget_amount))
+    return {"id": cursor.lastrowid, "name": name, "budget_amount": budget_amount}
+
+
+def update_category(conn, user_id, category_id, name=None, budget_amount=None):
+    return _execute(conn, UPDATE_CATEGORY, (name, budget_amount, category_id, user_id)).rowcount > 0
+
+
+def delete_category(conn, user_id, category_id):
+    return _execute(conn, DELETE_CATEGORY, (category_id, user_id)).rowcount > 0
+
+
+def create_bill(conn, user_id, category_id, description, amount, transaction_date, change_seq):
+    """Retorna a conta criada, ou None se a categoria não pertencer ao usuário."""
+    cursor = _execute(conn, INSERT_BILL, (description, amount, transaction_date, change_seq, category_id, user_id))
+    if cursor.rowcount == 0:
+        return None
+    return {
+        "id": cursor.lastrowid,
+        "user_id": user_id,
+        "category_id": category_id,
+        "description": description,
+        "amount": amount,
+        "transaction_date": transaction_date
+    }
+
+
+def lock_bill(conn, user_id, bill_id):
+    return _fetch_one(conn, LOCK_BILL, (bill_id, user_id))
+
+
+def update_bill(conn, user_id, bill_id, change_seq, category_id=None, description=None, amount=None,
+                transaction_date=None):
+    """False se a conta não for do usuário ou se a nova categoria não pertencer a ele."""
+    params = (category_id, description, amount, transaction_date, change_seq, bill_id, user_id,
+              category_id, category_id, user_id)
+    return _execute(conn, UPDATE_BILL, params).rowcount > 0
+
+
+def delete_bill(conn, user_id, bill_id):
+    return _execute(conn, DELETE_BILL, (bill_id, user_id)).rowcount > 0
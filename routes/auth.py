@@ -1,30 +1,35 @@
 from flask import Blueprint, request, jsonify
-from flask_bcrypt import Bcrypt
 from db import get_db_connection, close_db_connection
+import repository
 from utils.auth_helpers import create_jwt_token
 import mysql.connector
+from mysql.connector import errorcode
 from utils.auth_helpers import token_required
+from utils.budget_history import BUDGET_HISTORY_REBUILD_JOB
+from utils.budget_summary import invalidate_budget_summary
+from utils.job_queue import QueueFullError, get_job_queue
+from utils.password_hasher import HasherBusyError, get_password_hasher
 
 auth_bp = Blueprint('auth', __name__)
-bcrypt = Bcrypt()
 
 @auth_bp.route('/toggle_cumulative_budget', methods=['PUT'])
 @token_required
 def toggle_cumulative_budget(current_user_id):
     conn = get_db_connection()
-    cursor = conn.cursor()
     
     try:
-        cursor.execute("SELECT cumulative_budget FROM users WHERE id = %s", (current_user_id,))
-        result = cursor.fetchone()[0]
-        
-        if (not result):
-            cursor.execute("UPDATE users SET cumulative_budget = TRUE WHERE id = %s", (current_user_id,))
-            cursor.execute("CALL sp_recalculate_user_history(%s)", (current_user_id,))
-        else:
-            cursor.execute("UPDATE users SET cumulative_budget = FALSE WHERE id = %s", (current_user_id,))
+        cumulative = repository.toggle_cumulative_budget(conn, current_user_id)
+        if cumulative is None:
+            return jsonify({'message': 'Usuário não encontrado.'}), 404
+        if cumulative:
+            # The full rebuild runs on the job queue; bill writes keep the history current after that.
+            get_job_queue().enqueue(BUDGET_HISTORY_REBUILD_JOB, current_user_id)
         conn.commit()
-        return jsonify({'message': f'cumulative_budget atualizado para {not result} com sucesso!'}), 201
+        invalidate_budget_summary(current_user_id)
+        return jsonify({'message': f'cumulative_budget atualizado para {cumulative} com sucesso!'}), 201
+    except QueueFullError as err:
+        conn.rollback()
+        return jsonify({'message': str(err)}), 503
     except mysql.connector.Error as err:
         conn.rollback()
         return jsonify({'message': f'Erro no banco de dados: {err}'}), 500
@@ -42,21 +47,22 @@ def register_user():
         return jsonify({'message': 'Nome, email e senha são obrigatórios!'}), 400
 
     conn = get_db_connection()
-    cursor = conn.cursor()
     
     try:
-        cursor.execute("SELECT id FROM users WHERE email = %s",(email,))
-        if cursor.fetchone():
+        # Cheap check first so a taken email does not cost a hash; the unique index still settles races.
+        if repository.find_user_by_email(conn, email):
             return jsonify({'message': 'Email já cadastrado.'}), 409
-
-        hashed_password = bcrypt.generate_password_hash(password).decode('utf-8')
-        
-        cursor.execute(
-            "INSERT INTO users (name, email, password_hash) VALUES (%s, %s, %s)",
-            (name, email, hashed_password)
-        )
+        hashed_password = get_password_hasher().hash(password)
+        repository.create_user(conn, name, email, hashed_password)
         conn.commit()
         return jsonify({'message': 'Usuário registrado com sucesso!'}), 201
+    except HasherBusyError as err:
+        return jsonify({'message': str(err)}), 503
+    except mysql.connector.errors.IntegrityError as err:
+        conn.rollback()
+        if err.errno == errorcode.ER_DUP_ENTRY:
+            return jsonify({'message': 'Email já cadastrado.'}), 409
+        return jsonify({'message': f'Erro de integridade do banco de dados: {err}'}), 500
     except mysql.connector.Error as err:
         conn.rollback()
         return jsonify({'message': f'Erro no banco de dados: {err}'}), 500
@@ -73,17 +79,23 @@ def login_user():
         return jsonify({'message': 'Email e senha são obrigatórios!'}), 400
 
     conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
     
     try:
-        cursor.execute("SELECT id, password_hash, cumulative_budget FROM users WHERE email = %s", (email,))
-        user = cursor.fetchone()
+        user = repository.find_user_by_email(conn, email)
 
-        if not user or not bcrypt.check_password_hash(user['password_hash'], password):
+        hasher = get_password_hasher()
+        if not user or not hasher.verify(user['password_hash'], password):
             return jsonify({'message': 'Email ou senha inválidos.'}), 401
 
+        if hasher.needs_rehash(user['password_hash']):
+            # BCRYPT_LOG_ROUNDS changed: the plain password is only available now, at login.
+            repository.update_password_hash(conn, user['id'], hasher.hash(password))
+            conn.commit()
+
         token = create_jwt_token(user['id'])
         return jsonify({'message': 'Login bem-sucedido!', 'token': token, 'cumulative_budget': bool(user['cumulative_budget'])}), 200
+    except HasherBusyError as err:
+        return jsonify({'message': str(err)}), 503
     except mysql.connector.Error as err:
         return jsonify({'message': f'Erro no banco de dados: {err}'}), 500
     finally:
@@ -1,13 +1,29 @@
-from flask import Blueprint, request, jsonify
-import os
-import tempfile
+from flask import Blueprint, Response, request, jsonify, stream_with_context, url_for
+import json
 import asyncio
+import time
+from datetime import date
 from audio_process.nlp import ProcessadorFrase
+from audio_process.pipeline import AUDIO_BILL_JOB, salvar_conta
+from audio_process.speach_to_text import ErroConversaoAudio, get_transcritor
+from google.api_core.exceptions import GoogleAPICallError
+from pandas.errors import EmptyDataError, ParserError
+from werkzeug.exceptions import RequestEntityTooLarge
 from db import get_db_connection, close_db_connection
+from import_data import import_csv_stream, transaction_date_from_filename
+import repository
 from models import Bill
 from utils.auth_helpers import token_required
+from utils.bill_changes import next_change_seq, record_deletions
+from utils.bill_export import EXPORT_BILLS_QUERY, EXPORT_FORMATS, export_chunks
+from utils.budget_history import refresh_budget_history
+from utils.budget_summary import invalidate_budget_summary, parse_period
+from utils.category_cache import get_matcher, get_user_categories, invalidate_user_categories, resolve_category_id
+from utils.pagination import encode_cursor, decode_cursor, parse_limit
+from utils.job_queue import JobError, QueueFullError, get_job_queue
+from config import Config
 import mysql.connector
-from audio_process.speach_to_text import TranscritorGoogle
+from mysql.connector import errorcode
 
 bills_bp = Blueprint('bills', __name__)
 
@@ -20,74 +36,178 @@ def create_bill_from_audio(current_user_id):
     if audio_file.filename == '':
         return jsonify({'message': 'Nome do arquivo de áudio inválido!'}), 400
 
-    with tempfile.TemporaryDirectory() as tmpdir:
-        audio_path = os.path.join(tmpdir, audio_file.filename)
-        audio_file.save(audio_path)
-        transcricao_path = os.path.join(tmpdir, 'transcricao.json')
+    try:
+        job_id = get_job_queue().enqueue(
+            AUDIO_BILL_JOB, current_user_id, {'filename': audio_file.filename}, audio_file.read()
+        )
+    except QueueFullError as err:
+        return jsonify({'message': str(err)}), 503
 
-        transcritor = TranscritorGoogle()
-        transcritor.transcrever(audio_path, transcricao_path)
+    location = url_for('bills.get_audio_job', job_id=job_id)
+    return jsonify({'job_id': job_id, 'status': 'queued'}), 202, {'Location': location}
 
-        pf = ProcessadorFrase()
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        nlp_result = loop.run_until_complete(pf.processar_de_json(transcricao_path))
+@bills_bp.route('/bills/audio/jobs/<job_id>', methods=['GET'])
+@token_required
+def get_audio_job(current_user_id, job_id):
+    job = get_job_queue().get(job_id)
+    if not job or job['user_id'] != current_user_id or job['kind'] != AUDIO_BILL_JOB:
+        return jsonify({'message': 'Job não encontrado.'}), 404
+    return jsonify({
+        'job_id': job['id'],
+        'status': job['status'],
+        'bill': job['result'],
+        'error': job['error']
+    }), 200
 
-    category = nlp_result.get('categoria')
-    description = nlp_result.get('local')
-    amount = nlp_result.get('valor')
-    transaction_date = nlp_result.get('data')
-    if not all([category, description, amount, transaction_date]):
-        return jsonify({'message': 'Não foi possível extrair todos os dados do áudio.'}), 400
+def _read_audio_chunks(stream, chunk_size, max_bytes):
+    total = 0
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            return
+        total += len(chunk)
+        if total > max_bytes:
+            raise ValueError(f'Áudio excede o limite de {max_bytes} bytes.')
+        yield chunk
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
+def _ndjson(event):
+    return json.dumps(event, ensure_ascii=False) + '\n'
+
+def _stream_audio_bill(user_id, matcher, chunks):
+    final = None
     try:
-        cursor.execute("""
-                INSERT INTO bills (
-                    user_id, 
-                    category_id, 
-                    description, 
-                    amount, 
-                    transaction_date
-                ) VALUES (
-                    %s,
-                    (
-                        SELECT id 
-                          FROM categories 
-                         WHERE name    = %s 
-                           AND user_id = %s
-                    ), 
-                    %s, 
-                    %s,
-                    %s
-                );""",
-            (current_user_id, category, current_user_id, description, amount, transaction_date)
-        )
-        new_bill_id = cursor.lastrowid
-        conn.commit()
-        
-        cursor.execute("SELECT * FROM bills WHERE id = %s", (new_bill_id,))
-        new_bill_data = {
-            "id": new_bill_id, 
-            "user_id": current_user_id,\
-            "category_id": cursor.fetchone()[2],
-            "description": description,
-            "amount": amount,
-            "transaction_date": transaction_date
-        }
-        
-        if not new_bill_data:
-            return jsonify({'message': 'Erro ao recuperar a conta recém-criada.'}), 500
+        for result in get_transcritor().transcrever_stream(chunks):
+            if result['final']:
+                # The bill is created from the first final result; audio still arriving is ignored.
+                final = result['transcricao']
+                break
+            yield _ndjson({'type': 'interim', 'transcript': result['transcricao'], 'stability': result['estabilidade']})
+    except ErroConversaoAudio as err:
+        print(f"Erro ao converter o áudio em streaming: {err}")
+        yield _ndjson({'type': 'error', 'message': 'Formato de áudio não suportado.'})
+        return
+    except ValueError as err:
+        yield _ndjson({'type': 'error', 'message': str(err)})
+        return
+    except GoogleAPICallError as err:
+        yield _ndjson({'type': 'error', 'message': f'Erro na transcrição: {err.message}'})
+        return
 
-        return jsonify(new_bill_data), 201
-    
+    if not final:
+        yield _ndjson({'type': 'error', 'message': 'Nenhuma fala reconhecida no áudio.'})
+        return
+
+    nlp_result = asyncio.run(ProcessadorFrase(matcher).processar(final))
+    try:
+        bill = salvar_conta(user_id, nlp_result)
+    except JobError as err:
+        yield _ndjson({'type': 'error', 'transcript': final, 'message': str(err)})
+        return
+    yield _ndjson({'type': 'bill', 'transcript': final, 'bill': bill})
+
+@bills_bp.route('/bills/audio/stream', methods=['POST'])
+@token_required
+def create_bill_from_audio_stream(current_user_id):
+    # Raw audio body, ideally sent with Transfer-Encoding: chunked while it is being recorded.
+    try:
+        matcher = get_matcher(current_user_id)
     except mysql.connector.Error as err:
-        conn.rollback()
         return jsonify({'message': f'Erro no banco de dados: {err}'}), 500
-    finally:
-        if conn and conn.is_connected():
+
+    chunks = _read_audio_chunks(request.stream, Config.AUDIO_STREAM_CHUNK_SIZE, Config.AUDIO_STREAM_MAX_BYTES)
+    return Response(
+        stream_with_context(_stream_audio_bill(current_user_id, matcher, chunks)),
+        mimetype='application/x-ndjson'
+    )
+
+@bills_bp.route('/bills/text/batch', methods=['POST'])
+@token_required
+def create_bills_from_text_batch(current_user_id):
+    data = request.get_json(silent=True) or {}
+    phrases = data.get('phrases')
+    if not isinstance(phrases, list) or not phrases:
+        return jsonify({'message': 'Envie uma lista de frases em "phrases".'}), 400
+    if len(phrases) > Config.TEXT_BATCH_MAX_SIZE:
+        return jsonify({'message': f'Máximo de {Config.TEXT_BATCH_MAX_SIZE} frases por lote.'}), 400
+
+    results = [None] * len(phrases)
+    valid = []
+    for i, phrase in enumerate(phrases):
+        if isinstance(phrase, str) and phrase.strip():
+            valid.append((i, phrase.strip()))
+        else:
+            results[i] = {'index': i, 'status': 'error', 'message': 'Frase vazia ou inválida.'}
+
+    try:
+        pf = ProcessadorFrase(get_matcher(current_user_id))
+    except mysql.connector.Error as err:
+        return jsonify({'message': f'Erro no banco de dados: {err}'}), 500
+    parsed = asyncio.run(pf.processar_lote([phrase for _, phrase in valid]))
+
+    created = []
+    for (i, phrase), nlp_result in zip(valid, parsed):
+        bill = {
+            'category_id': nlp_result['categoria_id'],
+            'description': nlp_result['local'],
+            'amount': nlp_result['valor'],
+            'transaction_date': nlp_result['data']
+        }
+        if not bill['amount']:
+            results[i] = {'index': i, 'phrase': phrase, 'status': 'error', 'message': 'Valor não encontrado na frase.'}
+        elif not bill['category_id']:
+            results[i] = {'index': i, 'phrase': phrase, 'status': 'error',
+                          'message': f"Categoria '{nlp_result['categoria']}' não encontrada para este usuário."}
+        else:
+            created.append((i, phrase, bill))
+
+    if created:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            change_seq = next_change_seq(cursor, current_user_id)
+            # The matcher is cached per process and may still list a deleted category; checking (and
+            # share-locking) the ids here turns that into an error on the item instead of an FK failure.
+            category_ids = sorted({bill['category_id'] for _, _, bill in created})
+            placeholders = ', '.join(['%s'] * len(category_ids))
+            cursor.execute(
+                f"SELECT id FROM categories WHERE user_id = %s AND id IN ({placeholders}) FOR SHARE",
+                (current_user_id, *category_ids)
+            )
+            existing = {category_id for category_id, in cursor.fetchall()}
+            for i, phrase, bill in created:
+                if bill['category_id'] not in existing:
+                    results[i] = {'index': i, 'phrase': phrase, 'status': 'error',
+                                  'message': 'Categoria não encontrada ou não pertence a este usuário.'}
+            created = [entry for entry in created if entry[2]['category_id'] in existing]
+
+            if created:
+                cursor.executemany(
+                    "INSERT INTO bills (user_id, category_id, description, amount, transaction_date, change_seq) VALUES (%s, %s, %s, %s, %s, %s)",
+                    [(current_user_id, bill['category_id'], bill['description'], bill['amount'], bill['transaction_date'], change_seq)
+                     for _, _, bill in created]
+                )
+                # Same as bulk_bills: the change sequence identifies the new rows, in insertion order.
+                cursor.execute(
+                    "SELECT id FROM bills WHERE user_id = %s AND change_seq = %s ORDER BY id",
+                    (current_user_id, change_seq)
+                )
+                for (_, _, bill), (bill_id,) in zip(created, cursor.fetchall()):
+                    bill['id'] = bill_id
+                refresh_budget_history(cursor, current_user_id,
+                                       [(bill['category_id'], bill['transaction_date']) for _, _, bill in created])
+            conn.commit()
+            if created:
+                invalidate_budget_summary(current_user_id)
+        except mysql.connector.Error as err:
+            conn.rollback()
+            return jsonify({'message': f'Erro no banco de dados: {err}'}), 500
+        finally:
             close_db_connection(conn)
+        for i, phrase, bill in created:
+            results[i] = {'index': i, 'phrase': phrase, 'status': 'created', 'bill': bill}
+
+    errors = len(phrases) - len(created)
+    return jsonify({'created': len(created), 'errors': errors, 'results': results}), 201 if created else 400
 
 @bills_bp.route('/bills', methods=['POST'])
 @token_required
@@ -101,52 +221,84 @@ def create_bill(current_user_id):
     if not all([category_name, description, amount, transaction_date]):
         return jsonify({'message': 'Todos os campos são obrigatórios!'}), 400
 
+    try:
+        category_id = resolve_category_id(current_user_id, category_name)
+    except mysql.connector.Error as err:
+        return jsonify({'message': f'Erro no banco de dados: {err}'}), 500
+    if not category_id:
+        return jsonify({'message': f"Categoria '{category_name}' não encontrada para este usuário."}), 404
+
     conn = get_db_connection()
     cursor = conn.cursor()
 
     try:
-        cursor.execute(
-            """ INSERT INTO bills (
-                    user_id, 
-                    category_id, 
-                    description, 
-                    amount, 
-                    transaction_date) 
-                VALUES (%s,
-                        (SELECT id FROM categories WHERE name = %s AND user_id = %s) , 
-                        %s, 
-                        %s,
-                        %s);""",
-            (current_user_id, category_name, current_user_id, description, amount, transaction_date)
+        change_seq = next_change_seq(cursor, current_user_id)
+        new_bill = repository.create_bill(
+            conn, current_user_id, category_id, description, amount, transaction_date, change_seq
         )
-        new_bill_id = cursor.lastrowid
+        if not new_bill:
+            # The cached category was deleted in the meantime.
+            conn.rollback()
+            return jsonify({'message': f"Categoria '{category_name}' não encontrada para este usuário."}), 404
+        refresh_budget_history(cursor, current_user_id, [(category_id, transaction_date)])
         conn.commit()
-        
-        cursor.execute("SELECT * FROM bills WHERE id = %s", (new_bill_id,))
-        new_bill_data = {
-            "id": new_bill_id, 
-            "category_id": cursor.fetchone()[2],
-            "description": description,
-            "amount": amount,
-            "transaction_date": transaction_date
-        }
-        
-        if not new_bill_data:
-            return jsonify({'message': 'Erro ao recuperar a conta recém-criada.'}), 500
-
-        return jsonify(new_bill_data), 201
+        invalidate_budget_summary(current_user_id)
+        return jsonify(new_bill), 201
     except mysql.connector.Error as err:
         conn.rollback()
         return jsonify({'message': f'Erro no banco de dados: {err}'}), 500
     finally:
         close_db_connection(conn)
 
+# Same order as Bill.__slots__, so rows map straight onto Bill.from_row.
+BILL_COLUMNS = "id, user_id, category_id, description, amount, transaction_date, created_at"
+# rows: one object per bill; columnar: {"field": [values...]}, one array per field in the same order.
+BILL_FORMATS = ('rows', 'columnar')
+
+def _stream_bills(conn, cursor):
+    finished = False
+    try:
+        yield '['
+        first = True
+        while True:
+            rows = cursor.fetchmany(Config.BILLS_STREAM_CHUNK_SIZE)
+            if not rows:
+                break
+            chunk = ','.join(json.dumps(Bill.from_row(row).to_dict(), ensure_ascii=False) for row in rows)
+            yield chunk if first else ',' + chunk
+            first = False
+        yield ']'
+        finished = True
+    finally:
+        if not finished:
+            # The client went away mid-stream: unread rows are left on the connection.
+            conn.invalidate()
+        close_db_connection(conn)
+
 @bills_bp.route('/bills', methods=['GET'])
 @token_required
 def get_bills(current_user_id):
     start_date = request.args.get('start_date')
     final_date = request.args.get('final_date')
-    query = "SELECT * FROM bills WHERE user_id = %s"
+    after = request.args.get('after')
+    stream = request.args.get('stream', '').lower() in ('1', 'true')
+    response_format = request.args.get('format', 'rows')
+    if response_format not in BILL_FORMATS:
+        return jsonify({'message': f"Formato inválido, use um de: {', '.join(BILL_FORMATS)}."}), 400
+    if stream and response_format == 'columnar':
+        return jsonify({'message': 'format=columnar não pode ser combinado com stream.'}), 400
+    try:
+        limit = parse_limit(request.args.get('limit'), Config.BILLS_PAGE_MAX_LIMIT)
+        if after:
+            after_date, after_id = decode_cursor(after)
+            date.fromisoformat(after_date)
+            after_id = int(after_id)
+    except (ValueError, TypeError):
+        return jsonify({'message': 'Parâmetros de paginação inválidos.'}), 400
+    if after and limit is None:
+        limit = Config.BILLS_PAGE_MAX_LIMIT
+
+    query = f"SELECT {BILL_COLUMNS} FROM bills WHERE user_id = %s"
     params = [current_user_id]
     if start_date and final_date:
         query += " AND transaction_date BETWEEN %s AND %s"
@@ -157,20 +309,419 @@ def get_bills(current_user_id):
     elif final_date:
         query += " AND transaction_date <= %s"
         params.append(final_date)
-    query += " ORDER BY transaction_date DESC"
+    if after:
+        query += " AND (transaction_date < %s OR (transaction_date = %s AND id < %s))"
+        params.extend([after_date, after_date, after_id])
+    query += " ORDER BY transaction_date DESC, id DESC"
+    if limit is not None:
+        # One extra row tells whether another page exists.
+        query += " LIMIT %s"
+        params.append(limit if stream else limit + 1)
 
     conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
+    # Plain tuples: the models are built straight from them, without a dict per row.
+    cursor = conn.cursor()
+    streaming = False
     try:
         cursor.execute(query, tuple(params))
-        bills_data = cursor.fetchall()
-        bills = [Bill(**data).to_dict() for data in bills_data]
-        return jsonify(bills), 200
+        if stream:
+            # The generator owns the connection from here on and returns it when exhausted.
+            streaming = True
+            return Response(stream_with_context(_stream_bills(conn, cursor)), mimetype='application/json')
+
+        rows = cursor.fetchall()
+        next_cursor = None
+        if limit is not None and len(rows) > limit:
+            rows = rows[:limit]
+            last = Bill.from_row(rows[-1])
+            next_cursor = encode_cursor(last.transaction_date.isoformat(), last.id)
+        if response_format == 'columnar':
+            payload = Bill.columns(rows)
+        else:
+            payload = [Bill.from_row(row).to_dict() for row in rows]
+        response = Response(json.dumps(payload, ensure_ascii=False, separators=(',', ':')), mimetype='application/json')
+        if next_cursor:
+            response.headers['X-Next-Cursor'] = next_cursor
+        return response, 200
     except mysql.connector.Error as err:
         return jsonify({'message': f'Erro no banco de dados: {err}'}), 500
     finally:
+        if not streaming:
+            close_db_connection(conn)
+
+def _restore_write_timeout(conn):
+    # The pooled connection goes on to other requests, which must not inherit the export's timeout.
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SET SESSION net_write_timeout = DEFAULT")
+    finally:
+        cursor.close()
+
+def _stream_export(conn, chunks):
+    finished = False
+    try:
+        yield from chunks
+        finished = True
+    finally:
+        if finished:
+            try:
+                _restore_write_timeout(conn)
+            except mysql.connector.Error:
+                finished = False
+        if not finished:
+            # An abandoned export leaves unread rows; releasing the connection would read them all.
+            conn.invalidate()
         close_db_connection(conn)
 
+@bills_bp.route('/bills/export', methods=['GET'])
+@token_required
+def export_bills(current_user_id):
+    export_format = request.args.get('format', 'csv')
+    start_date = request.args.get('start_date')
+    final_date = request.args.get('final_date')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'message': f"Formato inválido, use um de: {', '.join(EXPORT_FORMATS)}."}), 400
+    try:
+        for value in (start_date, final_date):
+            if value:
+                date.fromisoformat(value)
+    except ValueError:
+        return jsonify({'message': 'Data inválida, use YYYY-MM-DD.'}), 400
+
+    query = EXPORT_BILLS_QUERY
+    params = [current_user_id]
+    if start_date:
+        query += " AND b.transaction_date >= %s"
+        params.append(start_date)
+    if final_date:
+        query += " AND b.transaction_date <= %s"
+        params.append(final_date)
+    query += " ORDER BY b.transaction_date, b.id"
+
+    conn = get_db_connection()
+    # Unbuffered: rows stay on the server until fetchmany asks for the next chunk.
+    cursor = conn.cursor(buffered=False)
+    streaming = False
+    try:
+        # A slow client pauses the reads; the server must not drop the result meanwhile.
+        cursor.execute("SET SESSION net_write_timeout = %s", (Config.EXPORT_NET_WRITE_TIMEOUT,))
+        cursor.execute(query, tuple(params))
+        chunks = export_chunks(export_format, cursor, Config.EXPORT_CHUNK_SIZE)
+        mimetype, extension = EXPORT_FORMATS[export_format]
+        streaming = True
+        response = Response(stream_with_context(_stream_export(conn, chunks)), mimetype=mimetype)
+        response.headers['Content-Disposition'] = f'attachment; filename="contas.{extension}"'
+        return response
+    except mysql.connector.Error as err:
+        return jsonify({'message': f'Erro no banco de dados: {err}'}), 500
+    finally:
+        if not streaming:
+            try:
+                _restore_write_timeout(conn)
+            except mysql.connector.Error:
+                conn.invalidate()
+            close_db_connection(conn)
+
+@bills_bp.route('/bills/import', methods=['POST'])
+@token_required
+def import_bills(current_user_id):
+    """Extrato CSV no formato da importação em lote (descrição, valor, categoria; a 1ª linha é ignorada).
+
+    O mês vem de period=YYYY-MM ou do nome do arquivo (MM-YYYY.csv). Reenvios só acrescentam as
+    linhas novas; dry_run=true informa o que seria importado sem gravar nada.
+    """
+    request.max_content_length = Config.IMPORT_MAX_BYTES
+    try:
+        upload = request.files.get('file')
+        period = request.form.get('period')
+        dry_run = request.values.get('dry_run', '').lower() in ('1', 'true')
+    except RequestEntityTooLarge:
+        return jsonify({'message': f'Arquivo maior que o limite de {Config.IMPORT_MAX_BYTES} bytes.'}), 413
+    if not upload or not upload.filename:
+        return jsonify({'message': 'Envie o extrato CSV no campo file.'}), 400
+    try:
+        transaction_date = parse_period(period) if period else transaction_date_from_filename(upload.filename)
+    except ValueError:
+        return jsonify({'message': 'Período inválido, use YYYY-MM.'}), 400
+    if not transaction_date:
+        return jsonify({'message': "Informe period=YYYY-MM ou envie o arquivo com o nome no padrão 'MM-YYYY.csv'."}), 400
+
+    start = time.perf_counter()
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        # Werkzeug spools large uploads to disk; read_csv pulls them from there one chunk at a time.
+        result = import_csv_stream(
+            cursor, upload.stream, current_user_id, transaction_date, Config.IMPORT_CHUNK_SIZE,
+            file_name=upload.filename, dry_run=dry_run
+        )
+        if dry_run:
+            conn.rollback()
+        else:
+            refresh_budget_history(
+                cursor, current_user_id, [(category_id, transaction_date) for category_id in result['category_ids']]
+            )
+            conn.commit()
+    except (EmptyDataError, ParserError, UnicodeDecodeError) as err:
+        conn.rollback()
+        return jsonify({'message': f'Não foi possível ler o CSV: {err}'}), 400
+    except mysql.connector.errors.IntegrityError as err:
+        conn.rollback()
+        if err.errno == errorcode.ER_DUP_ENTRY:
+            return jsonify({'message': 'Este arquivo já está sendo importado.'}), 409
+        return jsonify({'message': f'Erro de integridade do banco de dados: {err}'}), 500
+    except mysql.connector.Error as err:
+        conn.rollback()
+        return jsonify({'message': f'Erro no banco de dados: {err}'}), 500
+    finally:
+        close_db_connection(conn)
+
+    if result['imported'] and not dry_run:
+        # The import may have created categories as well as bills.
+        invalidate_user_categories(current_user_id)
+        invalidate_budget_summary(current_user_id)
+    return jsonify({
+        'dry_run': dry_run,
+        'skipped': result['skipped'],
+        'imported': result['imported'],
+        'duplicates': result['duplicates'],
+        'rejected': result['rejected'],
+        'elapsed_seconds': round(time.perf_counter() - start, 3)
+    }), 201 if result['imported'] and not dry_run else 200
+
+CHANGED_BILLS_QUERY = f"""
+    (SELECT {BILL_COLUMNS}, change_seq, 0 AS deleted
+     FROM bills
+     WHERE user_id = %s AND (change_seq > %s OR (change_seq = %s AND id > %s))
+     ORDER BY change_seq, id LIMIT %s)
+    UNION ALL
+    (SELECT bill_id, user_id, NULL, NULL, NULL, NULL, NULL, change_seq, 1
+     FROM bill_tombstones
+     WHERE user_id = %s AND (change_seq > %s OR (change_seq = %s AND bill_id > %s))
+     ORDER BY change_seq, bill_id LIMIT %s)
+    ORDER BY change_seq, id
+    LIMIT %s"""
+
+@bills_bp.route('/bills/changes', methods=['GET'])
+@token_required
+def get_bill_changes(current_user_id):
+    since = request.args.get('since')
+    try:
+        limit = parse_limit(request.args.get('limit'), Config.BILLS_PAGE_MAX_LIMIT) or Config.BILLS_PAGE_MAX_LIMIT
+        # No cursor: full sync, which includes rows written before change tracking (sequence 0).
+        since_seq, since_id = decode_cursor(since) if since else (-1, 0)
+        since_seq, since_id = int(since_seq), int(since_id)
+    except (ValueError, TypeError):
+        return jsonify({'message': 'Parâmetros de sincronização inválidos.'}), 400
+
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        page = (since_seq, since_seq, since_id, limit + 1)
+        cursor.execute(CHANGED_BILLS_QUERY, (current_user_id, *page, current_user_id, *page, limit + 1))
+        rows = cursor.fetchall()
+    except mysql.connector.Error as err:
+        return jsonify({'message': f'Erro no banco de dados: {err}'}), 500
+    finally:
+        close_db_connection(conn)
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    updated, deleted = [], []
+    for row in rows:
+        change_seq = row.pop('change_seq')
+        if row.pop('deleted'):
+            # A first sync has nothing to delete locally.
+            if since:
+                deleted.append(row['id'])
+        else:
+            updated.append(Bill(**row).to_dict())
+        since_seq, since_id = change_seq, row['id']
+
+    return jsonify({
+        'updated': updated,
+        'deleted': deleted,
+        'cursor': encode_cursor(since_seq, since_id),
+        'has_more': has_more
+    }), 200
+
+BULK_OPERATIONS = ('create', 'update', 'delete')
+BULK_UPDATE_FIELDS = ('category_id', 'description', 'amount', 'transaction_date')
+
+def _validate_bill_values(item, fields):
+    """Retorna a mensagem de erro do primeiro campo inválido, ou None."""
+    if 'amount' in fields and item.get('amount') is not None:
+        try:
+            float(item['amount'])
+        except (TypeError, ValueError):
+            return 'Valor inválido.'
+    if 'transaction_date' in fields and item.get('transaction_date'):
+        try:
+            date.fromisoformat(str(item['transaction_date']))
+        except ValueError:
+            return 'Data inválida, use YYYY-MM-DD.'
+    return None
+
+def _has_unknown_category(operations, categories):
+    category_ids = {category['id'] for category in categories.categories}
+    for item in operations:
+        if not isinstance(item, dict):
+            continue
+        if item.get('op') == 'create' and item.get('category_name') and not categories.resolve_id(item['category_name']):
+            return True
+        if item.get('op') == 'update' and item.get('category_id') is not None and item['category_id'] not in category_ids:
+            return True
+    return False
+
+@bills_bp.route('/bills/bulk', methods=['POST'])
+@token_required
+def bulk_bills(current_user_id):
+    data = request.get_json(silent=True) or {}
+    operations = data.get('operations')
+    if not isinstance(operations, list) or not operations:
+        return jsonify({'message': 'Envie uma lista de operações em "operations".'}), 400
+    if len(operations) > Config.BILLS_BULK_MAX_SIZE:
+        return jsonify({'message': f'Máximo de {Config.BILLS_BULK_MAX_SIZE} operações por lote.'}), 400
+
+    try:
+        categories = get_user_categories(current_user_id)
+        if _has_unknown_category(operations, categories):
+            # The cached list may predate a category created through another worker.
+            categories = get_user_categories(current_user_id, reload=True)
+    except mysql.connector.Error as err:
+        return jsonify({'message': f'Erro no banco de dados: {err}'}), 500
+    category_ids = {category['id'] for category in categories.categories}
+
+    results = [None] * len(operations)
+    creates, updates, deletes = [], [], []
+    touched = set()
+    for i, item in enumerate(operations):
+        op = item.get('op') if isinstance(item, dict) else None
+        error = None
+        if op not in BULK_OPERATIONS:
+            error = f"Operação inválida, use uma de: {', '.join(BULK_OPERATIONS)}."
+        elif op == 'create':
+            category_id = categories.resolve_id(item.get('category_name') or '')
+            if not all(item.get(f) for f in ('category_name', 'description', 'amount', 'transaction_date')):
+                error = 'Todos os campos são obrigatórios!'
+            elif not category_id:
+                error = f"Categoria '{item['category_name']}' não encontrada para este usuário."
+            else:
+                error = _validate_bill_values(item, BULK_UPDATE_FIELDS)
+            if not error:
+                creates.append((i, category_id, item))
+        else:
+            bill_id = item.get('id')
+            if not isinstance(bill_id, int) or isinstance(bill_id, bool):
+                error = 'Informe o id da conta.'
+            elif bill_id in touched:
+                error = 'A mesma conta aparece em mais de uma operação.'
+            elif op == 'update':
+                if not any(item.get(f) is not None for f in BULK_UPDATE_FIELDS):
+                    error = 'Nenhum dado fornecido para atualização.'
+                elif item.get('category_id') is not None and item['category_id'] not in category_ids:
+                    error = 'Categoria não encontrada ou não pertence a este usuário.'
+                else:
+                    error = _validate_bill_values(item, BULK_UPDATE_FIELDS)
+            if not error:
+                touched.add(bill_id)
+                (updates if op == 'update' else deletes).append((i, item))
+        if error:
+            results[i] = {'index': i, 'op': op, 'status': 'error', 'message': error}
+
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        # The user's row is locked first, as every other bill writer does: refresh_budget_history in a
+        # concurrent write reads this user's bills while holding it, so bills-then-user deadlocks.
+        change_seq = next_change_seq(cursor, current_user_id)
+        existing = {}
+        if touched:
+            # Locks the rows being changed, so the values merged below cannot go stale before the commit.
+            placeholders = ', '.join(['%s'] * len(touched))
+            cursor.execute(
+                f"SELECT id, category_id, description, amount, transaction_date FROM bills "
+                f"WHERE user_id = %s AND id IN ({placeholders}) FOR UPDATE",
+                (current_user_id, *touched)
+            )
+            existing = {row['id']: row for row in cursor.fetchall()}
+        for i, item in updates + deletes:
+            if item['id'] not in existing:
+                results[i] = {'index': i, 'op': item['op'], 'status': 'error',
+                              'message': 'Conta não encontrada ou não pertence a este usuário.'}
+
+        errors = sum(1 for result in results if result)
+        if errors:
+            # All or nothing: report every problem and write none of the batch.
+            conn.rollback()
+            for i, item in enumerate(operations):
+                if results[i] is None:
+                    results[i] = {'index': i, 'op': item['op'], 'status': 'skipped'}
+            return jsonify({'errors': errors, 'results': results}), 400
+
+        changes = []
+        if creates:
+            cursor.executemany(
+                "INSERT INTO bills (user_id, category_id, description, amount, transaction_date, change_seq) VALUES (%s, %s, %s, %s, %s, %s)",
+                [(current_user_id, category_id, item['description'], item['amount'], item['transaction_date'], change_seq)
+                 for _, category_id, item in creates]
+            )
+            changes.extend((category_id, item['transaction_date']) for _, category_id, item in creates)
+        if updates:
+            rows = []
+            for _, item in updates:
+                merged = {f: item[f] if item.get(f) is not None else existing[item['id']][f] for f in BULK_UPDATE_FIELDS}
+                rows.append((*(merged[f] for f in BULK_UPDATE_FIELDS), change_seq, item['id'], current_user_id))
+                previous = existing[item['id']]
+                changes.extend([(previous['category_id'], previous['transaction_date']),
+                                (merged['category_id'], merged['transaction_date'])])
+            cursor.executemany(
+                "UPDATE bills SET category_id = %s, description = %s, amount = %s, transaction_date = %s, change_seq = %s "
+                "WHERE id = %s AND user_id = %s",
+                rows
+            )
+        if deletes:
+            cursor.executemany(
+                "DELETE FROM bills WHERE id = %s AND user_id = %s",
+                [(item['id'], current_user_id) for _, item in deletes]
+            )
+            record_deletions(cursor, current_user_id, [item['id'] for _, item in deletes], change_seq)
+            changes.extend((existing[item['id']]['category_id'], existing[item['id']]['transaction_date'])
+                           for _, item in deletes)
+
+        created_ids = []
+        if creates:
+            # Ids of a multi-row INSERT are not guaranteed to be consecutive; the change sequence of
+            # this transaction identifies the new rows exactly, in insertion order.
+            cursor.execute(
+                "SELECT id FROM bills WHERE user_id = %s AND change_seq = %s ORDER BY id",
+                (current_user_id, change_seq)
+            )
+            updated_ids = {item['id'] for _, item in updates}
+            created_ids = [row['id'] for row in cursor.fetchall() if row['id'] not in updated_ids]
+
+        refresh_budget_history(cursor, current_user_id, changes)
+        conn.commit()
+        invalidate_budget_summary(current_user_id)
+    except mysql.connector.Error as err:
+        conn.rollback()
+        return jsonify({'message': f'Erro no banco de dados: {err}'}), 500
+    finally:
+        close_db_connection(conn)
+
+    for (i, _, _), bill_id in zip(creates, created_ids):
+        results[i] = {'index': i, 'op': 'create', 'status': 'created', 'id': bill_id}
+    for i, item in updates:
+        results[i] = {'index': i, 'op': 'update', 'status': 'updated', 'id': item['id']}
+    for i, item in deletes:
+        results[i] = {'index': i, 'op': 'delete', 'status': 'deleted', 'id': item['id']}
+    return jsonify({
+        'created': len(creates),
+        'updated': len(updates),
+        'deleted': len(deletes),
+        'results': results
+    }), 200
+
 @bills_bp.route('/bills/<int:bill_id>', methods=['PUT'])
 @token_required
 def update_bill(current_user_id, bill_id):
@@ -187,32 +738,28 @@ def update_bill(current_user_id, bill_id):
     cursor = conn.cursor()
 
     try:
-        cursor.execute("SELECT id FROM bills WHERE id = %s AND user_id = %s", (bill_id, current_user_id))
-        if not cursor.fetchone():
+        previous = repository.lock_bill(conn, current_user_id, bill_id)
+        if not previous:
             return jsonify({'message': 'Conta não encontrada ou não pertence a este usuário.'}), 404
 
-        updates = []
-        params = []
-        if category_id:
-            updates.append("category_id = %s")
-            params.append(category_id)
-        if description:
-            updates.append("description = %s")
-            params.append(description)
-        if amount is not None:
-            updates.append("amount = %s")
-            params.append(amount)
-        if transaction_date:
-            updates.append("transaction_date = %s")
-            params.append(transaction_date)
-        if not updates:
-            return jsonify({'message': 'Nenhum campo válido para atualização.'}), 400
-        query = f"UPDATE bills SET {', '.join(updates)} WHERE id = %s AND user_id = %s"
-        params.extend([bill_id, current_user_id])
-        cursor.execute(query, tuple(params))
+        change_seq = next_change_seq(cursor, current_user_id)
+        updated = repository.update_bill(
+            conn, current_user_id, bill_id, change_seq,
+            category_id=category_id or None,
+            description=description or None,
+            amount=amount,
+            transaction_date=transaction_date or None
+        )
+        if not updated:
+            conn.rollback()
+            return jsonify({'message': 'Categoria não encontrada ou não pertence a este usuário.'}), 404
+        # Both the month/category the bill left and the one it moved to change.
+        refresh_budget_history(cursor, current_user_id, [
+            (previous['category_id'], previous['transaction_date']),
+            (category_id or previous['category_id'], transaction_date or previous['transaction_date'])
+        ], cumulative=bool(previous['cumulative_budget']))
         conn.commit()
-        if cursor.rowcount == 0:
-            return jsonify({'message': 'Conta não encontrada ou nenhum dado alterado.'}), 404
+        invalidate_budget_summary(current_user_id)
         return jsonify({'message': 'Conta atualizada com sucesso!'}), 200
     except mysql.connector.Error as err:
         conn.rollback()
@@ -226,13 +773,16 @@ def delete_bill(current_user_id, bill_id):
     conn = get_db_connection()
     cursor = conn.cursor()
     try:
-        cursor.execute("SELECT id FROM bills WHERE id = %s AND user_id = %s", (bill_id, current_user_id))
-        if not cursor.fetchone():
+        previous = repository.lock_bill(conn, current_user_id, bill_id)
+        if not previous:
             return jsonify({'message': 'Conta não encontrada ou não pertence a este usuário.'}), 404
-        cursor.execute("DELETE FROM bills WHERE id = %s AND user_id = %s", (bill_id, current_user_id))
+        change_seq = next_change_seq(cursor, current_user_id)
+        repository.delete_bill(conn, current_user_id, bill_id)
+        record_deletions(cursor, current_user_id, [bill_id], change_seq)
+        refresh_budget_history(cursor, current_user_id, [(previous['category_id'], previous['transaction_date'])],
+                               cumulative=bool(previous['cumulative_budget']))
         conn.commit()
-        if cursor.rowcount == 0:
-            return jsonify({'message': 'Conta não encontrada ou já foi deletada.'}), 404
+        invalidate_budget_summary(current_user_id)
         return jsonify({'message': 'Conta deletada com sucesso!'}), 200
     except mysql.connector.Error as err:
         conn.rollback()
@@ -0,0 +1,42 @@
+from flask import Blueprint, request, jsonify
+from utils.auth_helpers import token_required
+from utils.budget_summary import parse_period, month_range, get_budget_summary
+from config import Config
+import mysql.connector
+
+budget_bp = Blueprint('budget', __name__)
+
+@budget_bp.route('/budget/summary', methods=['GET'])
+@token_required
+def get_summary(current_user_id):
+    period = request.args.get('period')
+    start = request.args.get('start')
+    end = request.args.get('end')
+
+    try:
+        if period:
+            start_period = end_period = parse_period(period)
+        elif start and end:
+            start_period, end_period = parse_period(start), parse_period(end)
+        else:
+            return jsonify({'message': 'Informe period=YYYY-MM ou start=YYYY-MM e end=YYYY-MM.'}), 400
+    except ValueError:
+        return jsonify({'message': 'Período inválido, use o formato YYYY-MM.'}), 400
+
+    if start_period > end_period:
+        return jsonify({'message': 'O início do intervalo deve ser anterior ao fim.'}), 400
+    if len(list(month_range(start_period, end_period))) > Config.BUDGET_SUMMARY_MAX_MONTHS:
+        return jsonify({'message': f'Máximo de {Config.BUDGET_SUMMARY_MAX_MONTHS} meses por consulta.'}), 400
+
+    try:
+        summary = get_budget_summary(current_user_id, start_period, end_period)
+    except mysql.connector.Error as err:
+        return jsonify({'message': f'Erro no banco de dados: {err}'}), 500
+
+    if period:
+        return jsonify({'cumulative': summary['cumulative'], **summary['periods'][0]}), 200
+    return jsonify({
+        'start': start_period.strftime('%Y-%m'),
+        'end': end_period.strftime('%Y-%m'),
+        **summary
+    }), 200
@@ -1,8 +1,12 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify
 from db import get_db_connection, close_db_connection
-from models import Category
+import repository
+from utils.budget_history import refresh_budget_history
+from utils.budget_summary import invalidate_budget_summary
+from utils.category_cache import get_current_user_categories, invalidate_user_categories
 from utils.auth_helpers import token_required
 import mysql.connector
+from mysql.connector import errorcode
 
 categories_bp = Blueprint('categories', __name__)
 
@@ -17,27 +21,18 @@ def create_category(current_user_id):
         return jsonify({'message': 'Nome da categoria é obrigatório!'}), 400
 
     conn = get_db_connection()
-    cursor = conn.cursor()
 
     try:
-        cursor.execute(
-            "SELECT id FROM categories WHERE user_id = %s AND name = %s",
-            (current_user_id, name)
-        )
-        if cursor.fetchone():
-            return jsonify({'message': 'Categoria já existe para este usuário.'}), 409
-
-        cursor.execute(
-            "INSERT INTO categories (user_id, name, budget_amount) VALUES (%s, %s, %s)",
-            (current_user_id, name, budget_amount)
-        )
+        new_category = repository.create_category(conn, current_user_id, name, budget_amount)
         conn.commit()
-        new_category = {
-            "id": cursor.lastrowid,
-            "name": name,
-            "budget_amount": budget_amount
-        }
+        invalidate_user_categories(current_user_id)
+        invalidate_budget_summary(current_user_id)
         return jsonify(new_category), 201
+    except mysql.connector.errors.IntegrityError as err:
+        conn.rollback()
+        if err.errno == errorcode.ER_DUP_ENTRY:
+            return jsonify({'message': 'Categoria já existe para este usuário.'}), 409
+        return jsonify({'message': f'Erro de integridade do banco de dados: {err}'}), 500
     except mysql.connector.Error as err:
         conn.rollback()
         return jsonify({'message': f'Erro no banco de dados: {err}'}), 500
@@ -47,19 +42,18 @@ def create_category(current_user_id):
 @categories_bp.route('/categories', methods=['GET'])
 @token_required
 def get_categories(current_user_id):
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    
     try:
-        cursor.execute("SELECT * FROM categories WHERE user_id = %s", (current_user_id,))
-        categories_data = cursor.fetchall()
-        
-        categories = [Category(**data).to_dict() for data in categories_data]
-        return jsonify(categories), 200
+        entry = get_current_user_categories(current_user_id)
     except mysql.connector.Error as err:
         return jsonify({'message': f'Erro no banco de dados: {err}'}), 500
-    finally:
-        close_db_connection(conn)
+
+    # The version check is one aggregate query; a matching ETag then costs no serialization.
+    if request.if_none_match.contains(entry.etag):
+        response = Response(status=304)
+    else:
+        response = Response(entry.body, mimetype='application/json')
+    response.set_etag(entry.etag)
+    return response
 
 @categories_bp.route('/categories/<int:category_id>', methods=['PUT'])
 @token_required
@@ -72,41 +66,28 @@ def update_category(current_user_id, category_id):
         return jsonify({'message': 'Nenhum dado fornecido para atualização.'}), 400
     
     conn = get_db_connection()
-    cursor = conn.cursor()
 
     try:
-        cursor.execute("SELECT id FROM categories WHERE id = %s AND user_id = %s", (category_id, current_user_id))
-        if not cursor.fetchone():
-            return jsonify({'message': 'Categoria não encontrada ou não pertence a este usuário.'}), 404
-
-        updates = []
-        params = []
-
-        if name:
-            updates.append("name = %s")
-            params.append(name)
+        if not repository.update_category(conn, current_user_id, category_id, name or None, budget_amount):
+            return jsonify({'message': 'Categoria não encontrada ou nenhum dado alterado.'}), 404
         if budget_amount is not None:
-            updates.append("budget_amount = %s")
-            params.append(budget_amount)
-        
-        if not updates:
-            return jsonify({'message': 'Nenhum campo válido para atualização.'}), 400
-
-        query = f"UPDATE categories SET {', '.join(updates)} WHERE id = %s AND user_id = %s"
-        params.extend([category_id, current_user_id])
-        
-        cursor.execute(query, tuple(params))
+            # Every month of the category's history carries the budget, so all of it is recomputed.
+            refresh_budget_history(conn.cursor(), current_user_id, [(category_id, None)])
         conn.commit()
-        
-        if cursor.rowcount == 0:
-            return jsonify({'message': 'Categoria não encontrada ou nenhum dado alterado.'}), 404
-        
+        invalidate_user_categories(current_user_id)
+        invalidate_budget_summary(current_user_id)
+
         new_category = {
             "id": category_id,
             "name": name,
             "budget_amount": budget_amount
         }
         return jsonify(new_category), 200
+    except mysql.connector.errors.IntegrityError as err:
+        conn.rollback()
+        if err.errno == errorcode.ER_DUP_ENTRY:
+            return jsonify({'message': 'Categoria já existe para este usuário.'}), 409
+        return jsonify({'message': f'Erro de integridade do banco de dados: {err}'}), 500
     except mysql.connector.Error as err:
         conn.rollback()
         return jsonify({'message': f'Erro no banco de dados: {err}'}), 500
@@ -117,19 +98,14 @@ def update_category(current_user_id, category_id):
 @token_required
 def delete_category(current_user_id, category_id):
     conn = get_db_connection()
-    cursor = conn.cursor()
 
     try:
-        cursor.execute("SELECT id FROM categories WHERE id = %s AND user_id = %s", (category_id, current_user_id))
-        if not cursor.fetchone():
+        if not repository.delete_category(conn, current_user_id, category_id):
             return jsonify({'message': 'Categoria não encontrada ou não pertence a este usuário.'}), 404
-        
-        cursor.execute("DELETE FROM categories WHERE id = %s AND user_id = %s", (category_id, current_user_id))
         conn.commit()
-        
-        if cursor.rowcount == 0:
-            return jsonify({'message': 'Categoria não encontrada ou já foi deletada.'}), 404
-        
+        invalidate_user_categories(current_user_id)
+        invalidate_budget_summary(current_user_id)
+
         return jsonify({'message': 'Categoria deletada com sucesso!'}), 200
     except mysql.connector.errors.IntegrityError as err:
         conn.rollback()
@@ -0,0 +1,17 @@
+def next_change_seq(cursor, user_id):
+    """Reserva o próximo número de alteração das contas do usuário, na transação do chamador.
+
+    Chame antes do INSERT da conta: o valor volta em lastrowid via LAST_INSERT_ID(expr), sem um SELECT.
+    """
+    cursor.execute(
+        "UPDATE users SET bills_change_seq = LAST_INSERT_ID(bills_change_seq + 1) WHERE id = %s",
+        (user_id,)
+    )
+    return cursor.lastrowid
+
+
+def record_deletions(cursor, user_id, bill_ids, change_seq):
+    cursor.executemany(
+        "INSERT INTO bill_tombstones (bill_id, user_id, change_seq) VALUES (%s, %s, %s)",
+        [(bill_id, user_id, change_seq) for bill_id in bill_ids]
+    )
@@ -0,0 +1,95 @@
+import csv
+import io
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+EXPORT_COLUMNS = ('id', 'category', 'description', 'amount', 'transaction_date', 'created_at')
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+EXPORT_BILLS_QUERY = """
+    SELECT b.id, c.name, b.description, b.amount, b.transaction_date, b.created_at
+    FROM bills b
+    JOIN categories c ON c.id = b.category_id
+    WHERE b.user_id = %s"""
+
+
+def _chunks(cursor, chunk_size):
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            return
+        yield rows
+
+
+def csv_chunks(cursor, chunk_size):
+    """Cabeçalho e depois um bloco de texto por fetchmany; nada além do bloco atual fica em memória."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for rows in _chunks(cursor, chunk_size):
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+class _Drain(io.RawIOBase):
+    """Destino do ParquetWriter que entrega os bytes ao gerador em vez de acumulá-los."""
+
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def take(self):
+        data = b''.join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def _parquet_schema():
+    return pa.schema([
+        ('id', pa.int64()),
+        ('category', pa.string()),
+        ('description', pa.string()),
+        ('amount', pa.decimal128(10, 2)),
+        ('transaction_date', pa.date32()),
+        ('created_at', pa.timestamp('s')),
+    ])
+
+
+def parquet_chunks(cursor, chunk_size):
+    """Um row group por fetchmany, enviado assim que é escrito; o rodapé sai no fim."""
+    schema = _parquet_schema()
+    sink = _Drain()
+    writer = pq.ParquetWriter(sink, schema, compression='snappy')
+    try:
+        for rows in _chunks(cursor, chunk_size):
+            columns = [list(column) for column in zip(*rows)]
+            writer.write_table(pa.Table.from_arrays(columns, schema=schema), row_group_size=len(rows))
+            yield sink.take()
+    finally:
+        writer.close()
+    yield sink.take()
+
+
+def export_chunks(export_format, cursor, chunk_size):
+    """Gerador do arquivo no formato pedido."""
+    if export_format == 'parquet':
+        return parquet_chunks(cursor, chunk_size)
+    return csv_chunks(cursor, chunk_size)
@@ -0,0 +1,86 @@
+from datetime import date
+from db import get_db_connection, close_db_connection
+from utils.job_queue import JobError, register_job_handler
+import mysql.connector
+
+BUDGET_HISTORY_REBUILD_JOB = 'budget_history_rebuild'
+
+DELETE_CATEGORY_HISTORY = """
+    DELETE FROM monthly_budget_history WHERE category_id = %s AND period >= %s"""
+
+# Same numbers sp_recalculate_user_history produces with its cursor loop, computed in one statement:
+# the running balance is the sum of (budget - spend) over the category's months with bills, seeded
+# with the ending balance of the last month before the recomputed range.
+INSERT_CATEGORY_HISTORY = """
+    INSERT INTO monthly_budget_history (category_id, period, base_budget, monthly_spend, starting_balance, ending_balance)
+    SELECT category_id, period, budget, spend,
+           opening + running - (budget - spend),
+           opening + running
+    FROM (
+        SELECT m.category_id, m.period, m.budget, m.spend,
+               SUM(m.budget - m.spend) OVER (ORDER BY m.period) AS running,
+               IFNULL((SELECT h.ending_balance FROM monthly_budget_history h
+                       WHERE h.category_id = m.category_id AND h.period < %s
+                       ORDER BY h.period DESC LIMIT 1), 0) AS opening
+        FROM (
+            SELECT b.category_id, DATE_FORMAT(b.transaction_date, '%Y-%m-01') AS period,
+                   IFNULL(c.budget_amount, 0) AS budget, SUM(b.amount) AS spend
+            FROM bills b
+            JOIN categories c ON c.id = b.category_id
+            WHERE b.category_id = %s AND b.transaction_date >= %s
+            GROUP BY b.category_id, period, c.budget_amount
+        ) m
+    ) t"""
+
+HISTORY_START = date(1900, 1, 1)
+
+
+def _month_start(value):
+    if value is None:
+        return HISTORY_START
+    if not isinstance(value, date):
+        value = date.fromisoformat(str(value)[:10])
+    return value.replace(day=1)
+
+
+def refresh_budget_history(cursor, user_id, changes, cumulative=None):
+    """Recalcula o histórico só das categorias afetadas, do mês alterado em diante.
+
+    changes: pares (category_id, data da conta); data None recalcula a categoria inteira.
+    cumulative: users.cumulative_budget, quando o chamador já o leu; senão é consultado aqui.
+    Roda na transação do chamador, antes do commit da escrita que motivou o recálculo.
+    """
+    if cumulative is None:
+        cursor.execute("SELECT cumulative_budget FROM users WHERE id = %s", (user_id,))
+        row = cursor.fetchone()
+        cumulative = bool(row and row[0])
+    if not cumulative:
+        # Without cumulative budgets there is no history; turning it on rebuilds everything.
+        return
+
+    earliest = {}
+    for category_id, transaction_date in changes:
+        if category_id is None:
+            continue
+        period = _month_start(transaction_date)
+        earliest[category_id] = min(period, earliest.get(category_id, period))
+
+    for category_id, period in earliest.items():
+        cursor.execute(DELETE_CATEGORY_HISTORY, (category_id, period))
+        cursor.execute(INSERT_CATEGORY_HISTORY, (period, category_id, period))
+
+
+@register_job_handler(BUDGET_HISTORY_REBUILD_JOB)
+def rebuild_budget_history_job(job):
+    """Reconstrução completa do histórico do usuário, para ativação do orçamento cumulativo e reparos."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("CALL sp_recalculate_user_history(%s)", (job['user_id'],))
+        conn.commit()
+        return {'user_id': job['user_id']}
+    except mysql.connector.Error as err:
+        conn.rollback()
+        raise JobError(f'Erro no banco de dados: {err}')
+    finally:
+        close_db_connection(conn)
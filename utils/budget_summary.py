@@ -0,0 +1,149 @@
+import threading
+from datetime import date
+from cachetools import TTLCache
+from config import Config
+from db import get_db_connection, close_db_connection
+
+
+def parse_period(value):
+    """'YYYY-MM' -> primeiro dia do mês; ValueError se o formato for inválido."""
+    year, month = value.split('-')
+    if len(year) != 4 or len(month) != 2:
+        raise ValueError('Período inválido.')
+    return date(int(year), int(month), 1)
+
+
+def next_month(period):
+    return date(period.year + 1, 1, 1) if period.month == 12 else date(period.year, period.month + 1, 1)
+
+
+def month_range(start, end):
+    period = start
+    while period <= end:
+        yield period
+        period = next_month(period)
+
+
+_summaries = TTLCache(maxsize=4096, ttl=Config.BUDGET_SUMMARY_CACHE_TTL)
+_summaries_lock = threading.Lock()
+
+
+def _load(user_id, start, end):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT cumulative_budget FROM users WHERE id = %s", (user_id,))
+        row = cursor.fetchone()
+        cumulative = bool(row and row[0])
+
+        cursor.execute(
+            "SELECT id, name, IFNULL(budget_amount, 0) FROM categories WHERE user_id = %s ORDER BY name",
+            (user_id,)
+        )
+        categories = cursor.fetchall()
+
+        cursor.execute(
+            """SELECT category_id, DATE_FORMAT(transaction_date, '%Y-%m-01') AS period, SUM(amount)
+               FROM bills
+               WHERE user_id = %s AND transaction_date >= %s AND transaction_date < %s
+               GROUP BY category_id, period""",
+            (user_id, start, next_month(end))
+        )
+        spend = {(category_id, date.fromisoformat(period)): total for category_id, period, total in cursor.fetchall()}
+
+        history = {}
+        if cumulative:
+            # Closed months come from the precomputed history; earlier rows seed the opening balance.
+            cursor.execute(
+                """SELECT h.category_id, h.period, h.starting_balance, h.ending_balance
+                   FROM monthly_budget_history h
+                   JOIN categories c ON c.id = h.category_id
+                   WHERE c.user_id = %s AND h.period <= %s
+                   ORDER BY h.category_id, h.period""",
+                (user_id, end)
+            )
+            for category_id, period, starting_balance, ending_balance in cursor.fetchall():
+                history.setdefault(category_id, []).append((period, starting_balance, ending_balance))
+        return cumulative, categories, spend, history
+    finally:
+        close_db_connection(conn)
+
+
+def _opening_balance(rows, start):
+    balance = 0
+    for period, _, ending_balance in rows:
+        if period >= start:
+            break
+        balance = ending_balance
+    return balance
+
+
+def _build(cumulative, categories, spend, history, start, end):
+    balances = {
+        category_id: _opening_balance(history.get(category_id, []), start) if cumulative else 0
+        for category_id, _, _ in categories
+    }
+    stored = {
+        (category_id, period): (starting_balance, ending_balance)
+        for category_id, rows in history.items()
+        for period, starting_balance, ending_balance in rows
+    }
+
+    periods = []
+    for period in month_range(start, end):
+        items = []
+        totals = {'budget': 0.0, 'spend': 0.0, 'starting_balance': 0.0, 'ending_balance': 0.0}
+        for category_id, name, budget in categories:
+            spent = spend.get((category_id, period), 0)
+            if not cumulative:
+                starting, ending = 0, budget - spent
+            elif (category_id, period) in stored:
+                starting, ending = stored[(category_id, period)]
+            elif spent:
+                # Month with bills not in the history yet: the same row refresh_budget_history would write.
+                starting = balances[category_id]
+                ending = starting + budget - spent
+            else:
+                # The history only accrues the budget in months with bills, so a month without any
+                # carries the balance unchanged and the next stored month starts where this one ends.
+                starting = ending = balances[category_id]
+            if cumulative:
+                balances[category_id] = ending
+            item = {
+                'category_id': category_id,
+                'name': name,
+                'budget': float(budget),
+                'spend': float(spent),
+                'starting_balance': float(starting),
+                'ending_balance': float(ending)
+            }
+            items.append(item)
+            for key in totals:
+                totals[key] += item[key]
+        periods.append({
+            'period': period.strftime('%Y-%m'),
+            'categories': items,
+            'totals': {key: round(value, 2) for key, value in totals.items()}
+        })
+    return {'cumulative': cumulative, 'periods': periods}
+
+
+def get_budget_summary(user_id, start, end):
+    """Gasto, orçamento e saldos por categoria para cada mês de start a end (inclusive)."""
+    key = (user_id, start, end)
+    with _summaries_lock:
+        summary = _summaries.get(key)
+    if summary is not None:
+        return summary
+
+    summary = _build(*_load(user_id, start, end), start, end)
+    with _summaries_lock:
+        _summaries[key] = summary
+    return summary
+
+
+def invalidate_budget_summary(user_id):
+    # Per process: other gunicorn workers catch up when BUDGET_SUMMARY_CACHE_TTL expires.
+    with _summaries_lock:
+        for key in [key for key in _summaries.keys() if key[0] == user_id]:
+            _summaries.pop(key, None)
@@ -0,0 +1,108 @@
+import hashlib
+import json
+import threading
+from cachetools import TTLCache
+from audio_process.category_matcher import CategoryMatcher
+from config import Config
+from db import get_db_connection, close_db_connection
+from models import Category
+
+
+# Cheap fingerprint of the user's categories, read from the database on every GET /categories:
+# creates and deletes change the count or max id, renames and budget changes change the checksum.
+CATEGORY_VERSION_QUERY = """
+    SELECT COUNT(*), COALESCE(MAX(id), 0),
+           COALESCE(BIT_XOR(CRC32(CONCAT_WS('|', id, name, budget_amount))), 0)
+    FROM categories WHERE user_id = %s"""
+SELECT_USER_CATEGORIES = "SELECT * FROM categories WHERE user_id = %s"
+
+
+class UserCategories:
+    """Categorias de um usuário já serializadas, com ETag e o matcher usado pelo NLP e pelas contas.
+
+    A ETag vem do estado do banco (CATEGORY_VERSION_QUERY), não do corpo em cache.
+    """
+
+    def __init__(self, rows, version):
+        self.categories = [Category(**row).to_dict() for row in rows]
+        self.body = json.dumps(self.categories, ensure_ascii=False).encode('utf-8')
+        self.version = version
+        self.etag = hashlib.sha256(repr(version).encode('utf-8')).hexdigest()[:32]
+        self.matcher = CategoryMatcher([(row['id'], row['name']) for row in rows])
+
+    def resolve_id(self, name):
+        # Same matching as the categories collation (utf8mb4_unicode_ci): case and accents are ignored.
+        found = self.matcher.resolver(name)
+        return found[0] if found else None
+
+
+_categories = TTLCache(maxsize=1024, ttl=Config.CATEGORY_CACHE_TTL)
+_categories_lock = threading.Lock()
+
+
+def _version(cursor, user_id):
+    cursor.execute(CATEGORY_VERSION_QUERY, (user_id,))
+    return tuple(int(value) for value in cursor.fetchone())
+
+
+def _load(user_id, version=None):
+    conn = get_db_connection()
+    try:
+        if version is None:
+            version = _version(conn.cursor(), user_id)
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(SELECT_USER_CATEGORIES, (user_id,))
+        entry = UserCategories(cursor.fetchall(), version)
+    finally:
+        close_db_connection(conn)
+
+    with _categories_lock:
+        _categories[user_id] = entry
+    return entry
+
+
+def get_user_categories(user_id, reload=False) -> UserCategories:
+    """Cópia em cache, que pode estar atrás de escritas feitas por outro worker.
+
+    reload=True lê de novo do banco; quem procura uma categoria e não acha deve tentar assim antes
+    de responder que ela não existe (resolve_category_id).
+    """
+    if not reload:
+        with _categories_lock:
+            entry = _categories.get(user_id)
+        if entry is not None:
+            return entry
+    return _load(user_id)
+
+
+def get_current_user_categories(user_id) -> UserCategories:
+    """Confere a versão no banco (uma consulta agregada) e só recarrega se ela mudou."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        version = _version(cursor, user_id)
+    finally:
+        close_db_connection(conn)
+    with _categories_lock:
+        entry = _categories.get(user_id)
+    if entry is not None and entry.version == version:
+        return entry
+    return _load(user_id, version)
+
+
+def resolve_category_id(user_id, name):
+    category_id = get_user_categories(user_id).resolve_id(name)
+    if category_id is None:
+        # Possibly created through another worker since this one cached the list.
+        category_id = get_user_categories(user_id, reload=True).resolve_id(name)
+    return category_id
+
+
+def get_matcher(user_id) -> CategoryMatcher:
+    return get_user_categories(user_id).matcher
+
+
+def invalidate_user_categories(user_id):
+    # Per process: other workers notice through resolve_category_id and the version check on GET.
+    with _categories_lock:
+        _categories.pop(user_id, None)
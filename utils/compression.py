@@ -0,0 +1,32 @@
+import gzip
+from flask import request
+from config import Config
+
+COMPRESSIBLE_MIMETYPES = ('application/json', 'application/x-ndjson', 'text/csv', 'text/plain')
+
+
+def _accepts_gzip():
+    # request.accept_encodings already honours q-values: "gzip;q=0" means no.
+    return request.accept_encodings['gzip'] > 0
+
+
+def _compress_response(response):
+    response.vary.add('Accept-Encoding')
+    if (response.direct_passthrough or response.is_streamed
+            or response.status_code < 200 or response.status_code in (204, 206, 304)
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES
+            or not _accepts_gzip()):
+        return response
+
+    body = response.get_data()
+    if len(body) < Config.GZIP_MIN_SIZE:
+        return response
+    response.set_data(gzip.compress(body, compresslevel=Config.GZIP_LEVEL))
+    response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+
+def init_app(app):
+    """Comprime com gzip as respostas grandes quando o cliente aceita; streams seguem sem compressão."""
+    app.after_request(_compress_response)
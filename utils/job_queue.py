@@ -0,0 +1,328 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from abc import ABC, abstractmethod
+from collections import deque
+from config import Config
+
+_handlers = {}
+
+
+class JobError(Exception):
+    """Falha esperada de um job; a mensagem é devolvida ao cliente."""
+
+
+class QueueFullError(Exception):
+    pass
+
+
+def register_job_handler(kind):
+    def decorator(func):
+        _handlers[kind] = func
+        return func
+    return decorator
+
+
+class JobQueue(ABC):
+    """Fila de jobs com um pool limitado de threads; subclasses definem o armazenamento.
+
+    purge_interval: segundos entre as limpezas de jobs antigos, feitas fora do caminho de cada consulta.
+    """
+
+    def __init__(self, workers=2, max_pending=100, poll_interval=1.0, purge_interval=60):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.poll_interval = poll_interval
+        self.purge_interval = purge_interval
+        self._next_purge = 0.0
+        self._purge_lock = threading.Lock()
+        self._wakeup = threading.Condition()
+        self._threads = []
+        self._stopping = False
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        self._stopping = True
+        with self._wakeup:
+            self._wakeup.notify_all()
+
+    def enqueue(self, kind, user_id, payload=None, data=None):
+        if kind not in _handlers:
+            raise ValueError(f"Nenhum handler registrado para '{kind}'.")
+        if self.max_pending and self._count_pending() >= self.max_pending:
+            raise QueueFullError('Fila de processamento cheia, tente novamente em instantes.')
+        job_id = uuid.uuid4().hex
+        self._insert(job_id, kind, user_id, payload or {}, data, time.time())
+        with self._wakeup:
+            self._wakeup.notify()
+        return job_id
+
+    def get(self, job_id):
+        return self._get(job_id)
+
+    def _purge_if_due(self, now):
+        with self._purge_lock:
+            if now < self._next_purge:
+                return
+            self._next_purge = now + self.purge_interval
+        self._purge(now)
+
+    def _run(self):
+        while not self._stopping:
+            now = time.time()
+            self._purge_if_due(now)
+            job = self._claim_next(now)
+            if job is None:
+                with self._wakeup:
+                    self._wakeup.wait(self.poll_interval)
+                continue
+            try:
+                result = _handlers[job['kind']](job)
+                self._finish(job['id'], 'done', result, None, time.time())
+            except JobError as err:
+                self._finish(job['id'], 'failed', None, str(err), time.time())
+            except Exception:
+                print(f"Erro inesperado no job {job['id']} ({job['kind']}):\n{traceback.format_exc()}")
+                self._finish(job['id'], 'failed', None, 'Erro interno ao processar o job.', time.time())
+
+    @abstractmethod
+    def _count_pending(self):
+        ...
+
+    @abstractmethod
+    def _insert(self, job_id, kind, user_id, payload, data, now):
+        ...
+
+    @abstractmethod
+    def _claim_next(self, now):
+        ...
+
+    @abstractmethod
+    def _finish(self, job_id, status, result, error, now):
+        ...
+
+    @abstractmethod
+    def _get(self, job_id):
+        ...
+
+    @abstractmethod
+    def _purge(self, now):
+        """Remove os jobs terminados há mais de retention segundos."""
+
+
+def _public(job):
+    return {key: job[key] for key in (
+        'id', 'kind', 'user_id', 'status', 'result', 'error', 'created_at', 'started_at', 'finished_at'
+    )}
+
+
+class MemoryJobQueue(JobQueue):
+    """Fila em memória do processo. Só enxerga jobs criados pelo próprio worker do gunicorn."""
+
+    def __init__(self, retention=86400, **kwargs):
+        super().__init__(**kwargs)
+        self.retention = retention
+        self._jobs = {}
+        self._pending = deque()
+        self._lock = threading.Lock()
+
+    def _count_pending(self):
+        with self._lock:
+            return len(self._pending)
+
+    def _insert(self, job_id, kind, user_id, payload, data, now):
+        with self._lock:
+            self._jobs[job_id] = {
+                'id': job_id, 'kind': kind, 'user_id': user_id, 'status': 'queued',
+                'payload': payload, 'data': data, 'result': None, 'error': None,
+                'created_at': now, 'started_at': None, 'finished_at': None,
+            }
+            self._pending.append(job_id)
+
+    def _purge(self, now):
+        with self._lock:
+            expired = [
+                job_id for job_id, job in self._jobs.items()
+                if job['finished_at'] and now - job['finished_at'] > self.retention
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+    def _claim_next(self, now):
+        with self._lock:
+            if not self._pending:
+                return None
+            job = self._jobs[self._pending.popleft()]
+            job['status'] = 'running'
+            job['started_at'] = now
+            return dict(job)
+
+    def _finish(self, job_id, status, result, error, now):
+        with self._lock:
+            job = self._jobs[job_id]
+            job.update(status=status, result=result, error=error, finished_at=now, data=None)
+
+    def _get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return _public(job) if job else None
+
+
+CLAIMABLE_JOBS = "status = 'queued' OR (status = 'running' AND started_at < ? AND attempts < ?)"
+
+
+class SQLiteJobQueue(JobQueue):
+    """Fila persistida em SQLite, compartilhada entre os workers do gunicorn na mesma máquina."""
+
+    def __init__(self, path, retention=86400, stale_after=600, max_attempts=3, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self.retention = retention
+        self.stale_after = stale_after
+        self.max_attempts = max_attempts
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    user_id INTEGER NOT NULL,
+                    status TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    data BLOB,
+                    result TEXT,
+                    error TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL
+                )""")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs (status, created_at)")
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _connection(self):
+        return _Transaction(self._conn())
+
+    def _count_pending(self):
+        # Plain reads run outside a transaction: BEGIN IMMEDIATE would queue them behind the workers' writes.
+        return self._conn().execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+
+    def _insert(self, job_id, kind, user_id, payload, data, now):
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, user_id, status, payload, data, created_at) VALUES (?, ?, ?, 'queued', ?, ?, ?)",
+                (job_id, kind, user_id, json.dumps(payload), data, now)
+            )
+
+    def _purge(self, now):
+        with self._connection() as conn:
+            conn.execute(
+                "DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?", (now - self.retention,)
+            )
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', error = 'Tempo de processamento excedido.', finished_at = ?, data = NULL "
+                "WHERE status = 'running' AND started_at < ? AND attempts >= ?",
+                (now, now - self.stale_after, self.max_attempts)
+            )
+
+    def _claim_next(self, now):
+        # Jobs left "running" by a worker that died are picked up again, a bounded number of times.
+        claimable = (now - self.stale_after, self.max_attempts)
+        # An idle poll only reads (WAL readers do not block writers); BEGIN IMMEDIATE is taken only
+        # when there is something to claim.
+        if self._conn().execute(f"SELECT 1 FROM jobs WHERE {CLAIMABLE_JOBS} LIMIT 1", claimable).fetchone() is None:
+            return None
+        with self._connection() as conn:
+            row = conn.execute(
+                f"SELECT * FROM jobs WHERE {CLAIMABLE_JOBS} ORDER BY created_at LIMIT 1", claimable
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', started_at = ?, attempts = attempts + 1 WHERE id = ?",
+                (now, row['id'])
+            )
+        job = self._row_to_job(row)
+        job['data'] = row['data']
+        job['payload'] = json.loads(row['payload'])
+        return job
+
+    def _finish(self, job_id, status, result, error, now):
+        with self._connection() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, data = NULL WHERE id = ?",
+                (status, json.dumps(result) if result is not None else None, error, now, job_id)
+            )
+
+    def _get(self, job_id):
+        row = self._conn().execute(
+            "SELECT id, kind, user_id, status, result, error, created_at, started_at, finished_at FROM jobs WHERE id = ?",
+            (job_id,)
+        ).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def _row_to_job(self, row):
+        job = {key: row[key] for key in (
+            'id', 'kind', 'user_id', 'status', 'error', 'created_at', 'started_at', 'finished_at'
+        )}
+        job['result'] = json.loads(row['result']) if row['result'] else None
+        return job
+
+
+class _Transaction:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
+
+
+_queue = None
+_queue_pid = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    global _queue, _queue_pid
+    pid = os.getpid()
+    if _queue is None or _queue_pid != pid:
+        with _queue_lock:
+            if _queue is None or _queue_pid != pid:
+                options = {
+                    'workers': Config.JOB_WORKERS,
+                    'max_pending': Config.JOB_QUEUE_MAX_PENDING,
+                    'retention': Config.JOB_RETENTION_SECONDS,
+                }
+                if Config.JOB_QUEUE_BACKEND == 'memory':
+                    queue = MemoryJobQueue(**options)
+                elif Config.JOB_QUEUE_BACKEND == 'sqlite':
+                    queue = SQLiteJobQueue(Config.JOB_QUEUE_PATH, stale_after=Config.JOB_STALE_AFTER, **options)
+                else:
+                    raise ValueError(f"JOB_QUEUE_BACKEND desconhecido: {Config.JOB_QUEUE_BACKEND}")
+                queue.start()
+                _queue = queue
+                _queue_pid = pid
+    return _queue
@@ -0,0 +1,201 @@
+import hmac
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from flask import g, has_app_context, request
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels[name] for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_labels(self.labelnames, key)} {_number(value)}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # key -> [per-bucket counts (non-cumulative, last one is +Inf), sum, count]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels[name] for name in self.labelnames)
+        index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = sorted((key, [list(counts), total, count]) for key, (counts, total, count) in self._series.items())
+        for key, (counts, total, count) in series:
+            cumulative = 0
+            for bound, bucket in zip((*self.buckets, float('inf')), counts):
+                cumulative += bucket
+                labels = _labels(self.labelnames, key, [('le', _number(bound))])
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {_number(total)}')
+            lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+REQUEST_DURATION = Histogram(
+    'http_request_duration_seconds', 'Tempo de resposta por rota.', ('method', 'route', 'status')
+)
+REQUEST_DB_QUERIES = Histogram(
+    'http_request_db_queries', 'Consultas ao banco por requisição.', ('method', 'route'), COUNT_BUCKETS
+)
+REQUEST_DB_DURATION = Histogram(
+    'http_request_db_seconds', 'Tempo gasto no banco por requisição.', ('method', 'route')
+)
+DB_QUERY_DURATION = Histogram(
+    'db_query_duration_seconds', 'Tempo de cada execute/executemany/callproc.', ('operation',), QUERY_BUCKETS
+)
+EXTERNAL_CALL_DURATION = Histogram(
+    'external_call_duration_seconds', 'Conversão de áudio, reconhecimento de fala e NLP.', ('call',)
+)
+EXTERNAL_CALL_ERRORS = Counter(
+    'external_call_errors_total', 'Chamadas externas que terminaram em exceção.', ('call',)
+)
+SLOW_REQUESTS = Counter(
+    'http_slow_requests_total', 'Requisições acima de SLOW_REQUEST_THRESHOLD.', ('method', 'route')
+)
+
+METRICS = (
+    REQUEST_DURATION, REQUEST_DB_QUERIES, REQUEST_DB_DURATION, DB_QUERY_DURATION,
+    EXTERNAL_CALL_DURATION, EXTERNAL_CALL_ERRORS, SLOW_REQUESTS,
+)
+
+_gauges = []
+
+
+def register_gauges(collect):
+    """collect() -> {nome: valor} lido a cada /metrics (ex.: estatísticas do pool de conexões)."""
+    _gauges.append(collect)
+
+
+def observe_query(sql, elapsed):
+    operation = sql.lstrip(' \n\t(').split(None, 1)[0].lower() if sql and sql.strip() else 'other'
+    if operation not in ('select', 'insert', 'update', 'delete', 'call', 'set'):
+        operation = 'other'
+    DB_QUERY_DURATION.observe(elapsed, operation=operation)
+    if has_app_context():
+        timing = g.get('_request_timing')
+        if timing is not None:
+            timing['db_queries'] += 1
+            timing['db_seconds'] += elapsed
+
+
+@contextmanager
+def time_external_call(call):
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        EXTERNAL_CALL_ERRORS.inc(call=call)
+        raise
+    finally:
+        EXTERNAL_CALL_DURATION.observe(time.perf_counter() - start, call=call)
+
+
+def render_metrics():
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    for collect in _gauges:
+        for name, value in sorted(collect().items()):
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                lines.append(f'# TYPE {name} gauge')
+                lines.append(f'{name} {_number(value)}')
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_authorized(authorization):
+    """Confere o cabeçalho Authorization com METRICS_TOKEN; sem token configurado, /metrics fica desligado."""
+    if not Config.METRICS_TOKEN:
+        return False
+    scheme, _, token = (authorization or '').partition(' ')
+    return scheme.lower() == 'bearer' and hmac.compare_digest(token.encode(), Config.METRICS_TOKEN.encode())
+
+
+def _route():
+    return request.url_rule.rule if request.url_rule else 'unmatched'
+
+
+def _start_timer():
+    g._request_timing = {'start': time.perf_counter(), 'db_queries': 0, 'db_seconds': 0.0}
+
+
+def _record_request(response):
+    timing = g.pop('_request_timing', None)
+    if timing is None:
+        return response
+    elapsed = time.perf_counter() - timing['start']
+    route = _route()
+    # Streamed responses are measured up to the first byte; the body is produced after this hook.
+    REQUEST_DURATION.observe(elapsed, method=request.method, route=route, status=response.status_code)
+    REQUEST_DB_QUERIES.observe(timing['db_queries'], method=request.method, route=route)
+    REQUEST_DB_DURATION.observe(timing['db_seconds'], method=request.method, route=route)
+    if Config.SLOW_REQUEST_THRESHOLD and elapsed >= Config.SLOW_REQUEST_THRESHOLD:
+        SLOW_REQUESTS.inc(method=request.method, route=route)
+        logger.warning(
+            'Requisição lenta: %s %s -> %s em %.3fs (%d consultas, %.3fs no banco)',
+            request.method, request.path, response.status_code, elapsed,
+            timing['db_queries'], timing['db_seconds']
+        )
+    return response
+
+
+def init_app(app):
+    """Mede cada requisição; os valores são por processo (cada worker do gunicorn expõe os seus)."""
+    app.before_request(_start_timer)
+    app.after_request(_record_request)
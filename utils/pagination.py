@@ -0,0 +1,30 @@
+import base64
+import json
+
+
+def encode_cursor(*values):
+    raw = json.dumps(list(values), separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, UnicodeError):
+        raise ValueError('Cursor inválido.')
+    if not isinstance(values, list):
+        raise ValueError('Cursor inválido.')
+    return values
+
+
+def parse_limit(value, max_limit):
+    if value is None:
+        return None
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ValueError('Parâmetro limit deve ser um número inteiro.')
+    if limit < 1:
+        raise ValueError('Parâmetro limit deve ser maior que zero.')
+    return min(limit, max_limit)
@@ -0,0 +1,120 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from flask_bcrypt import Bcrypt
+from config import Config
+
+
+class HasherBusyError(Exception):
+    pass
+
+
+class PasswordHasher:
+    """Executa o bcrypt num pool próprio e limitado, fora da thread da requisição.
+
+    O bcrypt libera o GIL enquanto calcula, então as demais requisições do worker seguem rodando;
+    o limite de fila impede que um pico de logins acumule trabalho que o cliente já abandonou.
+    """
+
+    def __init__(self, rounds=12, workers=2, max_queue=32, queue_timeout=5.0):
+        self.rounds = rounds
+        self.queue_timeout = queue_timeout
+        self._bcrypt = Bcrypt()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bcrypt')
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+        self._lock = threading.Lock()
+        self.workers = workers
+        self.max_queue = max_queue
+        self._pending = 0
+        self._rejected = 0
+        self._expired = 0
+        self._latency = {
+            'hash': {'count': 0, 'total': 0.0, 'max': 0.0},
+            'verify': {'count': 0, 'total': 0.0, 'max': 0.0},
+        }
+
+    def _record(self, operation, elapsed):
+        with self._lock:
+            latency = self._latency[operation]
+            latency['count'] += 1
+            latency['total'] += elapsed
+            latency['max'] = max(latency['max'], elapsed)
+
+    def _run(self, operation, func, *args):
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            with self._lock:
+                self._rejected += 1
+            raise HasherBusyError('Servidor ocupado, tente novamente em instantes.')
+        queued_at = time.monotonic()
+        with self._lock:
+            self._pending += 1
+
+        def task():
+            if time.monotonic() - queued_at > self.queue_timeout:
+                with self._lock:
+                    self._expired += 1
+                raise HasherBusyError('Servidor ocupado, tente novamente em instantes.')
+            start = time.monotonic()
+            result = func(*args)
+            self._record(operation, time.monotonic() - start)
+            return result
+
+        try:
+            return self._executor.submit(task).result()
+        finally:
+            with self._lock:
+                self._pending -= 1
+            self._slots.release()
+
+    def hash(self, password):
+        return self._run('hash', self._bcrypt.generate_password_hash, password, self.rounds).decode('utf-8')
+
+    def verify(self, password_hash, password):
+        return self._run('verify', self._bcrypt.check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        # $2b$12$<salt+hash>: the third field is the cost the hash was made with.
+        try:
+            return int(password_hash.split('$')[2]) != self.rounds
+        except (IndexError, ValueError):
+            return True
+
+    def stats(self):
+        with self._lock:
+            return {
+                'rounds': self.rounds,
+                'workers': self.workers,
+                'max_queue': self.max_queue,
+                'pending': self._pending,
+                'queue_depth': max(self._pending - self.workers, 0),
+                'rejected': self._rejected,
+                'expired': self._expired,
+                **{
+                    f'{operation}_{key}': round(value, 6) if key != 'count' else value
+                    for operation, latency in self._latency.items()
+                    for key, value in latency.items()
+                },
+            }
+
+
+_hasher = None
+_hasher_pid = None
+_hasher_lock = threading.Lock()
+
+
+def get_password_hasher():
+    # Executor threads do not survive fork(); each gunicorn worker builds its own.
+    global _hasher, _hasher_pid
+    pid = os.getpid()
+    if _hasher is None or _hasher_pid != pid:
+        with _hasher_lock:
+            if _hasher is None or _hasher_pid != pid:
+                _hasher = PasswordHasher(
+                    rounds=Config.BCRYPT_LOG_ROUNDS,
+                    workers=Config.BCRYPT_WORKERS,
+                    max_queue=Config.BCRYPT_MAX_QUEUE,
+                    queue_timeout=Config.BCRYPT_QUEUE_TIMEOUT
+                )
+                _hasher_pid = pid
+    return _hasher